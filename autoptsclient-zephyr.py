@@ -20,6 +20,7 @@
 import os
 import sys
 import argparse
+import hashlib
 from distutils.spawn import find_executable
 
 import autoptsclient_common as autoptsclient
@@ -27,6 +28,7 @@ import ptsprojects.zephyr as autoprojects
 import ptsprojects.stack as stack
 from pybtp import btp
 from ptsprojects.zephyr.iutctl import get_iut
+from ptsprojects.testcase import TestCaseRegistry
 
 
 def check_args(args):
@@ -41,11 +43,19 @@ def check_args(args):
         sys.exit("Server IP address not specified!")
 
     if tty_file:
-        if (not tty_file.startswith("/dev/tty") and
-                not tty_file.startswith("/dev/pts")):
-            sys.exit("%s is not a TTY file!" % repr(tty_file))
-        if not os.path.exists(tty_file):
-            sys.exit("%s TTY file does not exist!" % repr(tty_file))
+        if args.parallel:
+            if len(tty_file) != len(args.ip_addr):
+                sys.exit("One TTY file per server is needed in parallel "
+                         "mode!")
+        elif len(tty_file) != 1:
+            sys.exit("Only one TTY file can be used!")
+
+        for tty in tty_file:
+            if (not tty.startswith("/dev/tty") and
+                    not tty.startswith("/dev/pts")):
+                sys.exit("%s is not a TTY file!" % repr(tty))
+            if not os.path.exists(tty):
+                sys.exit("%s TTY file does not exist!" % repr(tty))
     else:  # no TTY - will run DUT in QEMU
         if not find_executable(qemu_bin):
             sys.exit("%s is needed but not found!" % (qemu_bin,))
@@ -54,6 +64,12 @@ def check_args(args):
         sys.exit("kernel_image %s is not a file!" % repr(kernel_image))
 
 
+def get_kernel_image_hash(kernel_image):
+    """Returns SHA-1 of kernel image to identify IUT build in TestCase.db"""
+    with open(kernel_image, "rb") as image:
+        return hashlib.sha1(image.read()).hexdigest()
+
+
 def parse_args():
     """Parses command line arguments and options"""
 
@@ -64,11 +80,12 @@ def parse_args():
                             help="Zephyr OS kernel image to be used for "
                             "testing. Normally a zephyr.elf file.")
 
-    arg_parser.add_argument("-t", "--tty-file",
+    arg_parser.add_argument("-t", "--tty-file", nargs="+",
                             help="If TTY is specified, BTP communication "
                             "with Zephyr OS running on hardware will "
                             "be done over this TTY. Hence, QEMU will "
-                            "not be used.")
+                            "not be used. With --parallel one TTY per "
+                            "server is given.")
 
     board_names = autoprojects.iutctl.Board.names
     arg_parser.add_argument("-b", "--board",
@@ -78,6 +95,23 @@ def parse_args():
                             "will not be reset. Supported boards: %s. " %
                             (", ".join(board_names,),), choices=board_names)
 
+    arg_parser.add_argument("-w", "--warm-iut", action="store_true",
+                            default=False,
+                            help="Keep IUT running after passed test cases "
+                            "and reset it with BTP commands. IUT is restarted "
+                            "if test case did not pass or IUT can not be "
+                            "reset this way.")
+
+    arg_parser.add_argument("--qemu-pool", type=int, default=0,
+                            metavar="N",
+                            help="Boot QEMU instances in advance on N "
+                            "controllers, so the next test case gets an "
+                            "already started IUT. Controller n is used over "
+                            "btproxy socket {}-n. Use N > 1 to have an IUT "
+                            "booted while test case runs. Not used with "
+                            "--tty-file.".format(
+                                autoprojects.iutctl.BT_SERVER_ADDRESS))
+
     # Hidden option to save test cases data in TestCase.db
     arg_parser.add_argument("-s", "--store", action="store_true",
                             default=False, help=argparse.SUPPRESS)
@@ -89,24 +123,19 @@ def parse_args():
     return args
 
 
-def main():
-    """Main."""
-    if os.geteuid() == 0:  # root privileges are not needed
-        sys.exit("Please do not run this program as root.")
+def init(args, callback_thread, tty_file, instance=None,
+         tc_db_table_name=None, iut_build=None):
+    """Initialize PTS instances, IUT and stack
 
-    args = parse_args()
-
-    if args.store:
-        tc_db_table_name = "zephyr_" + str(args.board)
-    else:
-        tc_db_table_name = None
-
-    callback_thread = autoptsclient.init_core()
-
-    ptses = autoptsclient.init_pts(args, callback_thread, tc_db_table_name)
+    Returns tuple of (ptses, test_cases) where test_cases is
+    TestCaseRegistry building test cases of a project when first needed
+    """
+    ptses = autoptsclient.init_pts(args, callback_thread, tc_db_table_name,
+                                   iut_build)
 
     btp.init(get_iut)
-    autoprojects.iutctl.init(args.kernel_image, args.tty_file, args.board)
+    autoprojects.iutctl.init(args.kernel_image, tty_file, args.board,
+                             args.warm_iut, args.qemu_pool, instance)
 
     stack.init_stack()
     stack_inst = stack.get_stack()
@@ -121,11 +150,68 @@ def main():
         autoprojects.gatt.set_pixits(ptses)
         autoprojects.mesh.set_pixits(ptses)
 
-    test_cases = autoprojects.gap.test_cases(ptses[0])
-    test_cases += autoprojects.gatt.test_cases(ptses)
-    test_cases += autoprojects.sm.test_cases(ptses[0])
-    test_cases += autoprojects.l2cap.test_cases(ptses[0])
-    test_cases += autoprojects.mesh.test_cases(ptses)
+    test_cases = TestCaseRegistry()
+    test_cases.add_project(
+        "GAP", lambda: autoprojects.gap.test_cases(ptses[0]))
+    test_cases.add_project(
+        "GATT", lambda: autoprojects.gatt.test_cases(ptses))
+    test_cases.add_project(
+        "SM", lambda: autoprojects.sm.test_cases(ptses[0]))
+    test_cases.add_project(
+        "L2CAP", lambda: autoprojects.l2cap.test_cases(ptses[0]))
+    test_cases.add_project(
+        "MESH", lambda: autoprojects.mesh.test_cases(ptses))
+
+    return ptses, test_cases
+
+
+def init_worker(index, args, callback_thread):
+    """Parallel worker initialization, see run_test_cases_parallel"""
+    tty_file = args.tty_file[index] if args.tty_file else None
+
+    return init(args, callback_thread, tty_file, index)
+
+
+def cleanup_worker(ptses):
+    """Parallel worker cleanup, see run_test_cases_parallel"""
+    autoprojects.iutctl.cleanup()
+
+    for pts in ptses:
+        pts.unregister_xmlrpc_ptscallback()
+
+
+def main():
+    """Main."""
+    if os.geteuid() == 0:  # root privileges are not needed
+        sys.exit("Please do not run this program as root.")
+
+    args = parse_args()
+
+    if args.store:
+        tc_db_table_name = "zephyr_" + str(args.board)
+        iut_build = get_kernel_image_hash(args.kernel_image)
+    else:
+        tc_db_table_name = None
+        iut_build = None
+
+    if args.parallel:
+        autoptsclient.init_logging()
+        autoptsclient.init_test_case_db(tc_db_table_name, iut_build)
+
+        autoptsclient.run_test_cases_parallel(args, init_worker,
+                                              cleanup_worker)
+
+        print "\nBye!"
+        sys.stdout.flush()
+        os._exit(0)
+
+    callback_thread = autoptsclient.init_core()
+
+    tty_file = args.tty_file[0] if args.tty_file else None
+
+    ptses, test_cases = init(args, callback_thread, tty_file,
+                             tc_db_table_name=tc_db_table_name,
+                             iut_build=iut_build)
 
     autoptsclient.run_test_cases(ptses, test_cases, args)
 
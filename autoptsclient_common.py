@@ -24,17 +24,25 @@ import socket
 import logging
 import xmlrpclib
 import Queue
+import copy
+import heapq
+import multiprocessing
+import collections
 import threading
 from traceback import format_exception
 from SimpleXMLRPCServer import SimpleXMLRPCServer
+from SocketServer import ThreadingMixIn
 import time
 import datetime
 import argparse
 from termcolor import colored
 
-from ptsprojects.testcase import PTSCallback, TestCaseLT1, TestCaseLT2
+from ptsprojects.testcase import PTSCallback, TestCaseLT1, TestCaseLT2, \
+    TestCaseRegistry, multicall
 from ptsprojects.testcase_db import TestCaseTable
 from pybtp.types import BTPError, SynchError
+from pybtp.iutctl_common import BTP_TRACE, set_btp_capture
+from pybtp.capture import BTPCapture, CAPTURE_EXT
 import ptsprojects.ptstypes as ptstypes
 from config import SERVER_PORT, CLIENT_PORT
 
@@ -44,8 +52,14 @@ import xml.etree.ElementTree as ET
 log = logging.debug
 
 RUNNING_TEST_CASE = {}
+# notified when state of any of RUNNING_TEST_CASE changes
+INSTANCES_STATE = threading.Condition()
+# states all of RUNNING_TEST_CASE have reached
+SYNCHRONIZED_STATES = set()
 TEST_CASE_DB = None
 LOG_DIR_NAME = None
+# write BTP capture file next to each test case log
+BTP_CAPTURE = False
 
 # To test autopts client locally:
 # Envrinment variable AUTO_PTS_LOCAL must be set for FakeProxy to
@@ -89,10 +103,65 @@ class _Method:
 xmlrpclib._Method = _Method
 
 
+class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """XML-RPC server handling each request in its own thread"""
+    daemon_threads = True
+
+
+class CallbackDispatcher(threading.Thread):
+    """Thread running callbacks of one test case in order they were queued"""
+
+    def __init__(self, test_case, exception):
+        """Constructor
+
+        test_case -- running TestCase instance the callbacks are for
+        exception -- queue to put exceptions raised by callbacks to
+        """
+        threading.Thread.__init__(self, name="dispatch " + test_case.name)
+        self.daemon = True
+        self.test_case = test_case
+        self.exception = exception
+        self.queue = Queue.Queue()
+
+    def put(self, func, *args):
+        """Queue func to be called with args"""
+        self.queue.put((func, args))
+
+    def flush(self):
+        """Wait till all queued callbacks are done"""
+        self.queue.join()
+
+    def stop(self):
+        self.queue.put(None)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+
+            try:
+                if item is None:
+                    return
+
+                func, args = item
+                func(*args)
+
+            except Exception:
+                logging.exception("Callback dispatch caught exception")
+                self.exception.put(sys.exc_info()[1])
+
+            finally:
+                self.queue.task_done()
+
+
 class ClientCallback(PTSCallback):
     def __init__(self):
         self.exception = Queue.Queue()
         self._pending_responses = {}
+        # CallbackDispatcher of each running test case
+        self._dispatchers = {}
+        # MMIs of both PTS instances are handled with the same IUT, so they
+        # are handled one at a time, logs are not
+        self._mmi_lock = threading.Lock()
 
     def error_code(self):
         """Return error code or None if there are no errors
@@ -139,17 +208,19 @@ class ClientCallback(PTSCallback):
                                 logtype_string, log_time, test_case_name,
                                 log_message))
 
-        try:
-            if test_case_name in RUNNING_TEST_CASE:
-                RUNNING_TEST_CASE[test_case_name].log(log_type, logtype_string,
-                                                      log_time, log_message)
+        # do not keep PTS waiting for e.g. MMI handled by the test case
+        dispatcher = self._get_dispatcher(test_case_name)
+        if dispatcher:
+            dispatcher.put(dispatcher.test_case.log, log_type,
+                           logtype_string, log_time, log_message)
 
-        except Exception as e:
-            logging.exception("Log caught exception")
-            self.exception.put(sys.exc_info()[1])
+    def log_batch(self, records):
+        """Handles log records batched by the server
 
-            # exit does not work, cause app is blocked in PTS.RunTestCase?
-            sys.exit("Exception in Log")
+        records -- list of log method arguments
+        """
+        for record in records:
+            self.log(*record)
 
     def on_implicit_send(self, project_name, wid, test_case_name, description,
                          style):
@@ -185,16 +256,20 @@ class ClientCallback(PTSCallback):
             # XXX: 361 WID MESH sends tc name with leading white spaces
             test_case_name = test_case_name.lstrip()
 
+            # test case has to handle the logs preceding the MMI first
+            self.flush(test_case_name)
+
             log("Calling test cases on_implicit_send")
             caller_pts_id = RUNNING_TEST_CASE.keys().index(test_case_name)
 
-            testcase_response \
-                = RUNNING_TEST_CASE[test_case_name].on_implicit_send(
-                    project_name,
-                    wid,
-                    test_case_name,
-                    description,
-                    style)
+            with self._mmi_lock:
+                testcase_response \
+                    = RUNNING_TEST_CASE[test_case_name].on_implicit_send(
+                        project_name,
+                        wid,
+                        test_case_name,
+                        description,
+                        style)
 
             log("test case returned on_implicit_send, response: %s",
                 testcase_response)
@@ -211,6 +286,43 @@ class ClientCallback(PTSCallback):
 
         return testcase_response
 
+    def _get_dispatcher(self, test_case_name):
+        """Returns CallbackDispatcher of running test case or None
+
+        Dispatcher keeps the test case instance, so it can be used after the
+        test case is not running anymore.
+        """
+        with INSTANCES_STATE:
+            test_case = RUNNING_TEST_CASE.get(test_case_name)
+            if test_case is None:
+                return None
+
+            dispatcher = self._dispatchers.get(test_case_name)
+            if dispatcher is None or dispatcher.test_case is not test_case:
+                if dispatcher:
+                    dispatcher.stop()
+
+                dispatcher = CallbackDispatcher(test_case, self.exception)
+                dispatcher.start()
+                self._dispatchers[test_case_name] = dispatcher
+
+            return dispatcher
+
+    def flush(self, test_case_name):
+        """Wait till test case handled all callbacks received so far"""
+        with INSTANCES_STATE:
+            dispatcher = self._dispatchers.get(test_case_name)
+
+        if dispatcher:
+            dispatcher.flush()
+
+    def stop_dispatchers(self):
+        """Stop dispatchers of test cases that are not running anymore"""
+        with INSTANCES_STATE:
+            for name in self._dispatchers.keys():
+                if name not in RUNNING_TEST_CASE:
+                    self._dispatchers.pop(name).stop()
+
     def get_pending_response(self, test_case_name):
         log("%s.%s, %s", self.__class__.__name__,
             self.get_pending_response.__name__, test_case_name)
@@ -243,19 +355,22 @@ class CallbackThread(threading.Thread):
 
     """
 
-    def __init__(self):
+    def __init__(self, port=CLIENT_PORT):
         log("%s.%s", self.__class__.__name__, self.__init__.__name__)
         threading.Thread.__init__(self)
+        self.port = port
         self.callback = ClientCallback()
 
     def run(self):
         """Starts the xmlrpc callback server"""
         log("%s.%s", self.__class__.__name__, self.run.__name__)
 
-        log("Serving on port %s ...", CLIENT_PORT)
+        log("Serving on port %s ...", self.port)
 
-        server = SimpleXMLRPCServer(("", CLIENT_PORT),
-                                    allow_none=True, logRequests=False)
+        # PTS instances and their log and MMI callbacks are served
+        # concurrently
+        server = ThreadingXMLRPCServer(("", self.port),
+                                       allow_none=True, logRequests=False)
         server.register_instance(self.callback)
         server.register_introspection_functions()
         server.serve_forever()
@@ -264,6 +379,15 @@ class CallbackThread(threading.Thread):
         log("%s.%s", self.__class__.__name__, self.error_code.__name__)
         return self.callback.error_code()
 
+    def flush(self, test_case_name):
+        log("%s.%s, %s", self.__class__.__name__, self.flush.__name__,
+            test_case_name)
+        return self.callback.flush(test_case_name)
+
+    def stop_dispatchers(self):
+        log("%s.%s", self.__class__.__name__, self.stop_dispatchers.__name__)
+        return self.callback.stop_dispatchers()
+
     def set_pending_response(self, pending_response):
         log("%s.%s, %r", self.__class__.__name__,
             self.set_pending_response.__name__, pending_response)
@@ -321,6 +445,28 @@ def init_logging():
     log("Created logs directory %r", LOG_DIR_NAME)
 
 
+def init_worker_logging(index):
+    """Initialize logging of parallel worker process
+
+    Worker logs to its own file, test case logs go to LOG_DIR_NAME of the
+    parent process.
+
+    """
+    script_name = os.path.basename(sys.argv[0])
+    script_name_no_ext = os.path.splitext(script_name)[0]
+
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+
+    file_handler = logging.FileHandler(
+        "%s-worker%d.log" % (script_name_no_ext, index), mode='w')
+    file_handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(name)s %(levelname)s %(filename)-25s "
+        "%(lineno)-5s %(funcName)-25s : %(message)s"))
+    logger.addHandler(file_handler)
+
+
 class FakeProxy(object):
     """Fake PTS XML-RPC proxy client.
 
@@ -360,6 +506,12 @@ class FakeProxy(object):
     def update_pixit_param(self, project_name, param_name, new_param_value):
         pass
 
+    def set_pixits_bulk(self, project_name, pixits):
+        pass
+
+    def set_pics_bulk(self, project_name, pics):
+        pass
+
     def run_test_case(self, project_name, test_case_name):
         pass
 
@@ -399,7 +551,7 @@ def init_pts_thread_entry(proxy, local_address, workspace_path, bd_addr,
 
     log("Client IP Address: %s", client_ip_address)
 
-    proxy.register_xmlrpc_ptscallback(client_ip_address, CLIENT_PORT)
+    proxy.register_xmlrpc_ptscallback(client_ip_address, callback_thread.port)
 
     log("Opening workspace: %s", workspace_path)
     proxy.open_workspace(workspace_path)
@@ -413,8 +565,18 @@ def init_pts_thread_entry(proxy, local_address, workspace_path, bd_addr,
     proxy.enable_maximum_logging(enable_max_logs)
 
 
-def init_pts(args, callback_thread, tc_db_table_name=None):
-    """Initialization procedure for PTS instances"""
+def init_test_case_db(tc_db_table_name, iut_build=None):
+    """Open TestCase.db table to store test case results in"""
+    if tc_db_table_name:
+        global TEST_CASE_DB
+        TEST_CASE_DB = TestCaseTable(tc_db_table_name, iut_build)
+
+
+def init_pts(args, callback_thread, tc_db_table_name=None, iut_build=None):
+    """Initialization procedure for PTS instances
+
+    iut_build - IUT build identifier stored in test case history
+    """
 
     proxy_list = []
     thread_list = []
@@ -438,9 +600,10 @@ def init_pts(args, callback_thread, tc_db_table_name=None):
         proxy_list.append(proxy)
         thread_list.append(thread)
 
-    if tc_db_table_name:
-        global TEST_CASE_DB
-        TEST_CASE_DB = TestCaseTable(tc_db_table_name)
+    init_test_case_db(tc_db_table_name, iut_build)
+
+    global BTP_CAPTURE
+    BTP_CAPTURE = args.btp_capture
 
     for index, thread in enumerate(thread_list):
         thread.join(timeout=180.0)
@@ -464,6 +627,15 @@ def get_result_color(status):
 
 
 class TestCaseRunStats(object):
+    """Results of test cases run in this session
+
+    Results are kept in memory and snapshotted to xml_results file at most
+    every snapshot_interval seconds, so they survive client crash.
+
+    """
+
+    snapshot_interval = 60
+
     def __init__(self, projects, test_cases, retry_count, db=None):
 
         self.run_count_max = retry_count + 1  # Run test at least once
@@ -475,10 +647,14 @@ class TestCaseRunStats(object):
         self.margin = 3
         self.index = 0
 
+        # test case name -> result dict, in order of first run
+        self.results = collections.OrderedDict()
+        self.status_count = {}
+        self.regressions = collections.OrderedDict()
+
         self.xml_results = tempfile.NamedTemporaryFile(delete=False).name
-        root = ET.Element("results")
-        tree = ET.ElementTree(root)
-        tree.write(self.xml_results)
+        self.last_snapshot = 0
+        self.snapshot()
 
         self.db = db
 
@@ -493,75 +669,77 @@ class TestCaseRunStats(object):
         else:
             self.est_duration = 0
 
-    def update(self, test_case_name, duration, status):
-        tree = ET.parse(self.xml_results)
-        root = tree.getroot()
+    def update(self, test_case_name, duration, status, settle_time=None):
+        """Store result of test case run
 
-        elem = root.find("./test_case[@name='%s']" % test_case_name)
-        if elem is None:
-            elem = ET.SubElement(root, 'test_case')
+        settle_time - time IUT and PTS took to settle down after the run, None
+                      if test case was not run
 
+        Returns True if test case regressed
+        """
+        result = self.results.get(test_case_name)
+        if result is None:
             status_previous = None
             if self.db:
                 status_previous = self.db.get_result(test_case_name)
 
-            elem.attrib["project"] = test_case_name.split('/')[0]
-            elem.attrib["name"] = test_case_name
-            elem.attrib["duration"] = str(duration)
-            elem.attrib["status"] = ""
-            elem.attrib["status_previous"] = str(status_previous)
-
-            run_count = 0
+            result = {
+                "project": test_case_name.split('/')[0],
+                "name": test_case_name,
+                "duration": str(duration),
+                "status": "",
+                "status_previous": str(status_previous),
+                "run_count": 0,
+            }
+            self.results[test_case_name] = result
         else:
-            run_count = int(elem.attrib["run_count"])
+            self.status_count[result["status"]] -= 1
 
-        elem.attrib["status"] = status
+        result["status"] = status
+        self.status_count[status] = self.status_count.get(status, 0) + 1
 
-        if elem.attrib["status"] != "PASS" and \
-                        elem.attrib["status_previous"] == "PASS":
+        if result["status"] != "PASS" and \
+                        result["status_previous"] == "PASS":
             regression = True
+            self.regressions[test_case_name] = True
         else:
             regression = False
+            self.regressions.pop(test_case_name, None)
 
-        elem.attrib["regression"] = str(regression)
-        elem.attrib["run_count"] = str(run_count + 1)
+        result["regression"] = str(regression)
+        result["settle_time"] = str(settle_time)
+        result["run_count"] += 1
 
-        tree.write(self.xml_results)
+        if time.time() - self.last_snapshot >= self.snapshot_interval:
+            self.snapshot()
 
         return regression
 
-    def get_results(self):
-        tree = ET.parse(self.xml_results)
-        root = tree.getroot()
+    def snapshot(self):
+        """Atomically write results to xml_results file"""
+        root = ET.Element("results")
 
-        results = {}
+        for result in self.results.itervalues():
+            elem = ET.SubElement(root, 'test_case')
+            for key, value in result.iteritems():
+                elem.attrib[key] = str(value)
 
-        for tc_xml in root.findall("./test_case"):
-            results[tc_xml.attrib["name"]] = \
-                tc_xml.attrib["status"]
+        tmp_file = self.xml_results + ".tmp"
+        ET.ElementTree(root).write(tmp_file)
+        os.rename(tmp_file, self.xml_results)
 
-        return results
+        self.last_snapshot = time.time()
 
-    def get_regressions(self):
-        tree = ET.parse(self.xml_results)
-        root = tree.getroot()
-        tcs_xml = root.findall("./test_case[@regression='True']")
+    def get_results(self):
+        return {name: result["status"]
+                for name, result in self.results.iteritems()}
 
-        return [tc_xml.attrib["name"] for tc_xml in tcs_xml]
+    def get_regressions(self):
+        return self.regressions.keys()
 
     def get_status_count(self):
-        tree = ET.parse(self.xml_results)
-        root = tree.getroot()
-
-        status_dict = {}
-
-        for test_case_xml in root.findall("./test_case"):
-            if test_case_xml.attrib["status"] not in status_dict:
-                status_dict[test_case_xml.attrib["status"]] = 0
-
-            status_dict[test_case_xml.attrib["status"]] += 1
-
-        return status_dict
+        return {status: count for status, count in self.status_count.items()
+                if count}
 
     def print_summary(self):
         """Prints test case list status summary"""
@@ -616,57 +794,66 @@ class TestCaseRunStats(object):
               str(regressions_count).rjust(count_just))
 
 
+def format_test_case_name(stats, test_case_name):
+    """Returns test case line of the run output up to the result"""
+    num_test_cases_width = stats.num_test_cases_width
+    margin = stats.margin
+    project_name_width = stats.max_project_name + margin
+
+    return (str(stats.index + 1).rjust(num_test_cases_width) +
+            "/" +
+            str(stats.num_test_cases).ljust(num_test_cases_width + margin) +
+            test_case_name.split('/')[0].ljust(project_name_width) +
+            test_case_name.ljust(stats.max_test_case_name + margin - 1))
+
+
+def print_test_case_result(stats, run_count, status, end_time, regression):
+    """Prints result part of test case line of the run output"""
+    margin = stats.margin
+
+    retries_max = stats.run_count_max - 1
+    if run_count:
+        retries_msg = "#{}".format(run_count)
+    else:
+        retries_msg = ""
+
+    if regression and run_count == retries_max:
+        regression_msg = "REGRESSION"
+    else:
+        regression_msg = ""
+
+    end_time_str = str(round(datetime.timedelta(
+        seconds=end_time).total_seconds(), 3))
+
+    result = ("{}".format(status).ljust(16) +
+              end_time_str.rjust(len(end_time_str)) +
+            retries_msg.rjust(len("#{}".format(retries_max)) + margin) +
+            regression_msg.rjust(len("REGRESSION") + margin))
+
+    if sys.stdout.isatty():
+        output_color = get_result_color(status)
+        print(colored((result), output_color))
+    else:
+        print(result)
+
+
 def run_test_case_wrapper(func):
     def wrapper(*args):
         test_case_name = args[2]
         stats = args[3]
 
-        run_count_max = stats.run_count_max
-        run_count = stats.run_count
-        num_test_cases = stats.num_test_cases
-        num_test_cases_width = stats.num_test_cases_width
-        max_project_name = stats.max_project_name
-        max_test_case_name = stats.max_test_case_name
-        margin = stats.margin
-        index = stats.index
-
-        print (str(index + 1).rjust(num_test_cases_width) +
-               "/" +
-               str(num_test_cases).ljust(num_test_cases_width + margin) +
-               test_case_name.split('/')[0].ljust(max_project_name + margin) +
-               test_case_name.ljust(max_test_case_name + margin - 1)),
+        print format_test_case_name(stats, test_case_name),
         sys.stdout.flush()
 
         start_time = time.time()
-        status = func(*args)
+        status, settle_time = func(*args)
         end_time = time.time() - start_time
 
-        regression = stats.update(test_case_name, end_time, status)
+        regression = stats.update(test_case_name, end_time, status,
+                                  settle_time)
 
-        retries_max = run_count_max - 1
-        if run_count:
-            retries_msg = "#{}".format(run_count)
-        else:
-            retries_msg = ""
-
-        if regression and run_count == retries_max:
-            regression_msg = "REGRESSION"
-        else:
-            regression_msg = ""
-
-        end_time_str = str(round(datetime.timedelta(
-            seconds=end_time).total_seconds(), 3))
-
-        result = ("{}".format(status).ljust(16) +
-                  end_time_str.rjust(len(end_time_str)) +
-                retries_msg.rjust(len("#{}".format(retries_max)) + margin) +
-                regression_msg.rjust(len("REGRESSION") + margin))
-
-        if sys.stdout.isatty():
-            output_color = get_result_color(status)
-            print(colored((result), output_color))
-        else:
-            print(result)
+        print_test_case_result(stats, stats.run_count, status, end_time,
+                               regression)
 
         return status, end_time
 
@@ -706,9 +893,26 @@ def log2file(function):
         # file_handler.setLevel(logging.ERROR)
         logger.addHandler(file_handler)
 
-        function(*args)
+        BTP_TRACE.clear()
 
-        logger.removeHandler(file_handler)
+        if BTP_CAPTURE:
+            capture_file = os.path.splitext(log_filename)[0] + CAPTURE_EXT
+            capture = BTPCapture(capture_file)
+            set_btp_capture(capture)
+
+        try:
+            function(*args)
+        finally:
+            # keep the tail of the capture if test case raised
+            if BTP_CAPTURE:
+                set_btp_capture(None)
+                capture.close()
+
+            # BTP frames are only formatted if test case did not pass
+            if test_case.status != "PASS":
+                BTP_TRACE.dump()
+
+            logger.removeHandler(file_handler)
 
     return wrapper
 
@@ -735,24 +939,40 @@ def get_error_code(exc):
     return error_code
 
 
+def set_instance_state(test_case, state):
+    """Set state of test case instance and wake up synchronize_instances"""
+    with INSTANCES_STATE:
+        test_case.state = state
+        INSTANCES_STATE.notify_all()
+
+
 def synchronize_instances(state, break_state=None):
-    """Synchronize instances to be in one state before executing further"""
-    match = False
+    """Synchronize instances to be in one state before executing further
 
-    while True:
-        time.sleep(1)
-        match = True
+    Returns as soon as all instances are in state. Raises SynchError if any
+    instance is in one of break_state states instead.
 
-        for tc in RUNNING_TEST_CASE.itervalues():
-            if tc.state != state:
-                if break_state and tc.state in break_state:
-                    raise SynchError
+    """
+    with INSTANCES_STATE:
+        while True:
+            # other instances may have moved on before this one woke up
+            if state in SYNCHRONIZED_STATES:
+                return
 
-                match = False
-                continue
+            match = True
 
-        if match:
-            return
+            for tc in RUNNING_TEST_CASE.itervalues():
+                if tc.state != state:
+                    if break_state and tc.state in break_state:
+                        raise SynchError
+
+                    match = False
+
+            if match:
+                SYNCHRONIZED_STATES.add(state)
+                return
+
+            INSTANCES_STATE.wait()
 
 
 @log2file
@@ -775,14 +995,17 @@ def run_test_case_thread_entry(pts, test_case):
     error_code = None
 
     try:
-        RUNNING_TEST_CASE[test_case.name] = test_case
-        test_case.state = "PRE_RUN"
+        set_instance_state(test_case, "PRE_RUN")
         test_case.pre_run()
         test_case.status = "RUNNING"
-        test_case.state = "RUNNING"
-        synchronize_instances(test_case.state)
+        set_instance_state(test_case, "RUNNING")
+        # abort if other instance failed before running
+        synchronize_instances(test_case.state, ["FINISHING"])
         error_code = pts.run_test_case(test_case.project_name, test_case.name)
 
+        # final verdict may still be queued
+        pts.callback_thread.flush(test_case.name)
+
         log("After run_test_case error_code=%r status=%r",
             error_code, test_case.status)
 
@@ -803,43 +1026,46 @@ def run_test_case_thread_entry(pts, test_case):
         error_code = get_error_code(None)
 
     finally:
-        test_case.state = "FINISHING"
+        set_instance_state(test_case, "FINISHING")
         synchronize_instances(test_case.state)
         test_case.post_run(error_code)  # stop qemu and other commands
-        del RUNNING_TEST_CASE[test_case.name]
 
     log("Done TestCase %s %s", run_test_case_thread_entry.__name__,
         test_case)
 
 
-@run_test_case_wrapper
-def run_test_case(ptses, test_case_instances, test_case_name, stats):
+def execute_test_case(ptses, registry, test_case_name):
+    """Runs test case on PTS instances
+
+    registry - TestCaseRegistry of test case instances
+
+    Returns tuple of (status, settle time), settle time is None if test case
+    was not run
+    """
     def test_case_lookup_name(name, test_case_class):
-        """Return 'test_case_class' instance if found or None otherwise"""
-        if test_case_instances is None:
+        """Return copy of 'test_case_class' instance if found or None
+        otherwise"""
+        tc = registry.get(name, test_case_class)
+        if tc is None:
             return None
 
-        for tc in test_case_instances:
-            if tc.name == name and isinstance(tc, test_case_class):
-                return tc.copy()
-
-        return None
+        return tc.copy()
 
     # Lookup TestCase class instance
     test_case_lt1 = test_case_lookup_name(test_case_name, TestCaseLT1)
     if test_case_lt1 is None:
         # FIXME
-        return 'NOT_IMPLEMENTED'
+        return 'NOT_IMPLEMENTED', None
 
     if test_case_lt1.name_lt2:
         if len(ptses) < 2:
-            return 'LT2_NOT_AVAILABLE'
+            return 'LT2_NOT_AVAILABLE', None
 
         test_case_lt2 = test_case_lookup_name(test_case_lt1.name_lt2,
                                               TestCaseLT2)
         if test_case_lt2 is None:
             # FIXME
-            return 'NOT_IMPLEMENTED'
+            return 'NOT_IMPLEMENTED', None
     else:
         test_case_lt2 = None
 
@@ -851,6 +1077,13 @@ def run_test_case(ptses, test_case_instances, test_case_name, stats):
         # Multi-instance related stuff
         pts_threads = []
 
+        # register all instances before any of them gets to synchronize
+        with INSTANCES_STATE:
+            SYNCHRONIZED_STATES.clear()
+            RUNNING_TEST_CASE[test_case_lt1.name] = test_case_lt1
+            if test_case_lt2:
+                RUNNING_TEST_CASE[test_case_lt2.name] = test_case_lt2
+
         pts_thread = threading.Thread(
             target=run_test_case_thread_entry,
             args=(ptses[0], test_case_lt1))
@@ -868,11 +1101,21 @@ def run_test_case(ptses, test_case_instances, test_case_name, stats):
         for pts_thread in pts_threads:
             pts_thread.join()
 
+        with INSTANCES_STATE:
+            RUNNING_TEST_CASE.clear()
+
+        ptses[0].callback_thread.stop_dispatchers()
+
         if test_case_lt2 and test_case_lt2.status != "PASS" \
                 and test_case_lt1.status == "PASS":
-            return test_case_lt2.status
+            return test_case_lt2.status, test_case_lt1.settle_time
+
+        return test_case_lt1.status, test_case_lt1.settle_time
 
-        return test_case_lt1.status
+
+@run_test_case_wrapper
+def run_test_case(ptses, registry, test_case_name, stats):
+    return execute_test_case(ptses, registry, test_case_name)
 
 
 test_case_blacklist = [
@@ -882,61 +1125,376 @@ test_case_blacklist = [
 ]
 
 
-def run_test_cases(ptses, test_case_instances, args):
-    """Runs a list of test cases"""
+class RetryPolicy(object):
+    """Decides if test case that did not pass is run again
+
+    Test case is not retried if it can not pass on retry: it is not
+    implemented, needs LT2 that is not available, or failed with FAIL verdict
+    in each of fail_history last runs stored in TestCase.db. Other verdicts,
+    e.g. INCONC or BTP TIMEOUT, are retried up to retry_max times.
+
+    """
+
+    # statuses that do not change on retry
+    deterministic = ['NOT_IMPLEMENTED', 'LT2_NOT_AVAILABLE']
+
+    fail_history = 3
+
+    def __init__(self, retry_max, db=None):
+        self.retry_max = retry_max
+        self.db = db
+
+    def fails_always(self, test_case_name):
+        """True if test case failed in each of fail_history last runs"""
+        if not self.db or not self.fail_history:
+            return False
+
+        results = self.db.get_last_results(test_case_name, self.fail_history)
+
+        if len(results) < self.fail_history:
+            return False
+
+        return all(result == 'FAIL' for result in results)
+
+    def should_retry(self, test_case_name, status, run_count):
+        """Returns True if test case should be run again
+
+        run_count - number of retries done already
+        """
+        if status == 'PASS' or run_count >= self.retry_max:
+            return False
+
+        if status in self.deterministic:
+            return False
+
+        if status == 'FAIL' and self.fails_always(test_case_name):
+            log("%s failed in last %d runs, not retrying", test_case_name,
+                self.fail_history)
+            return False
+
+        return True
+
+
+def shard_test_cases(test_cases, shard_count, db=None):
+    """Split test cases into shards of similar total duration
+
+    Longest processing time first: test cases are taken starting from the
+    longest one and each is added to the shard with the lowest total duration
+    so far. Durations come from runs of other IUT builds in db, which clients
+    running other shards of the same build do not change, so they get
+    disjoint test cases. Test cases not found in db are assumed to take the
+    mean duration of known ones.
+
+    test_cases - list of test case names
+    shard_count - number of shards
+    db - TestCaseTable to get durations from
+
+    Returns list of shard_count lists of test case names, longest first
+    """
+    durations = db.get_baseline_durations(test_cases) if db else {}
+
+    if durations:
+        default_duration = sum(durations.values()) / len(durations)
+    else:
+        default_duration = 1.0
+
+    # heap of (total duration, shard index)
+    totals = [(0.0, i) for i in range(shard_count)]
+    shards = [[] for _ in range(shard_count)]
+
+    for test_case in sorted(test_cases, key=lambda tc: (
+            -durations.get(tc, default_duration), tc)):
+        total, i = heapq.heappop(totals)
+        shards[i].append(test_case)
+        heapq.heappush(totals,
+                       (total + durations.get(test_case, default_duration), i))
+
+    return shards
+
+
+def parse_shard(shard):
+    """Parse K/N shard argument to 0-based (index, count) tuple"""
+    try:
+        index, count = [int(n) for n in shard.split("/")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("%r is not K/N" % shard)
+
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("%r: K must be between 1 and N" %
+                                         shard)
+
+    return index - 1, count
+
+
+def get_test_case_list(pts, args):
+    """Returns tuple of (projects, test cases names) to run"""
+
+    excluded = tuple(args.excluded or [])
+    selected = tuple(args.test_cases or [])
 
     def run_or_not(test_case_name):
         for entry in test_case_blacklist:
             if entry in test_case_name:
                 return False
 
-        if args.excluded:
-            for n in args.excluded:
-                if test_case_name.startswith(n):
-                    return False
-
-        if args.test_cases:
-            for n in args.test_cases:
-                if test_case_name.startswith(n):
-                    return True
-
+        if excluded and test_case_name.startswith(excluded):
             return False
 
+        if selected:
+            return test_case_name.startswith(selected)
+
         return True
 
     test_cases = []
 
-    projects = ptses[0].get_project_list()
+    projects = pts.get_project_list()
 
-    for project in projects:
-        _test_case_list = ptses[0].get_test_case_list(project)
+    for _test_case_list in multicall(pts, "get_test_case_list",
+                                     [(project,) for project in projects]):
         test_cases += [tc for tc in _test_case_list if run_or_not(tc)]
 
+    return projects, test_cases
+
+
+def get_test_case_descriptions(pts, test_case_names):
+    """Returns dictionary of test case name to its description"""
+    test_case_names = list(test_case_names)
+
+    descriptions = multicall(
+        pts, "get_test_case_description",
+        [(name.split('/')[0], name) for name in test_case_names])
+
+    return dict(zip(test_case_names, descriptions))
+
+
+def run_test_cases(ptses, test_case_instances, args):
+    """Runs a list of test cases
+
+    test_case_instances - TestCaseRegistry or list of TestCase instances
+    """
+
+    if isinstance(test_case_instances, TestCaseRegistry):
+        registry = test_case_instances
+    else:
+        registry = TestCaseRegistry(test_case_instances)
+    projects, test_cases = get_test_case_list(ptses[0], args)
+
+    if args.shard:
+        shard_index, shard_count = args.shard
+        test_cases = shard_test_cases(test_cases, shard_count,
+                                      TEST_CASE_DB)[shard_index]
+
     # Statistics
     stats = TestCaseRunStats(projects, test_cases, args.retry, TEST_CASE_DB)
+    retry_policy = RetryPolicy(args.retry, TEST_CASE_DB)
 
-    for test_case in test_cases:
-        stats.run_count = 0
+    # retries go to the end of the queue, so that they run on fresh IUT
+    queue = collections.deque(test_cases)
+    run_count = dict.fromkeys(test_cases, 0)
 
-        while True:
-            status, duration = run_test_case(ptses, test_case_instances,
-                                             test_case, stats)
+    while queue:
+        test_case = queue.popleft()
+        stats.run_count = run_count[test_case]
 
-            if status == 'PASS' or stats.run_count == args.retry:
-                if TEST_CASE_DB:
-                    TEST_CASE_DB.update_statistics(test_case, duration, status)
+        status, duration = run_test_case(ptses, registry, test_case, stats)
 
-                break
+        if retry_policy.should_retry(test_case, status, stats.run_count):
+            run_count[test_case] += 1
+            queue.append(test_case)
+            continue
 
-            stats.run_count += 1
+        if TEST_CASE_DB:
+            TEST_CASE_DB.update_statistics(test_case, duration, status,
+                                           stats.run_count)
 
         stats.index += 1
 
+    if TEST_CASE_DB:
+        TEST_CASE_DB.flush()
+
+    stats.snapshot()
     stats.print_summary()
 
     return stats.get_status_count(), stats.get_results(), stats.get_regressions()
 
 
+def parallel_worker_entry(index, args, init_worker, cleanup_worker,
+                          work_queue, result_queue):
+    """Parallel worker process entry
+
+    Runs test cases taken from work_queue till None is taken and puts their
+    results to result_queue.
+
+    """
+    init_worker_logging(index)
+
+    try:
+        callback_thread = CallbackThread(CLIENT_PORT + index)
+        callback_thread.daemon = True
+        callback_thread.start()
+
+        ptses, test_case_instances = init_worker(index, args, callback_thread)
+        if isinstance(test_case_instances, TestCaseRegistry):
+            registry = test_case_instances
+        else:
+            registry = TestCaseRegistry(test_case_instances)
+        projects, test_cases = get_test_case_list(ptses[0], args)
+
+    except Exception as error:
+        logging.exception(error)
+        result_queue.put(("error", index, str(error)))
+        return
+
+    result_queue.put(("ready", index, projects, test_cases))
+
+    try:
+        while True:
+            test_case_name = work_queue.get()
+            if test_case_name is None:
+                break
+
+            result_queue.put(("start", index, test_case_name))
+
+            start_time = time.time()
+
+            # report the test case failed and go on with the next one
+            try:
+                status, settle_time = execute_test_case(ptses, registry,
+                                                        test_case_name)
+            except Exception as error:
+                logging.exception(error)
+                status, settle_time = get_error_code(error), None
+
+            duration = time.time() - start_time
+
+            result_queue.put(("result", index, test_case_name, status,
+                              duration, settle_time))
+    finally:
+        cleanup_worker(ptses)
+
+
+def run_test_cases_parallel(args, init_worker, cleanup_worker):
+    """Runs test cases on independent PTS servers at the same time
+
+    Every server in args.ip_addr gets a worker process with its own PTS
+    instance, IUT and callback port: CLIENT_PORT + worker index. Workers take
+    test cases from a shared queue, longest first, and results are merged
+    into TestCaseRunStats in this process. Failed test cases are retried at
+    the end of the queue. Test cases that need LT2 are not available, since
+    every worker has one PTS.
+
+    init_worker - called in worker process with (index, args, callback_thread)
+                  where args have only the worker PTS server. Returns tuple
+                  of (ptses, test_case_instances), see run_test_cases
+    cleanup_worker - called in worker process with ptses when it is done
+
+    Returns the same as run_test_cases
+    """
+    work_queue = multiprocessing.Queue()
+    result_queue = multiprocessing.Queue()
+    workers = []
+
+    for index, server_addr in enumerate(args.ip_addr):
+        worker_args = copy.copy(args)
+        worker_args.ip_addr = [server_addr]
+        worker_args.local_addr = \
+            [args.local_addr[index] if args.local_addr else None]
+
+        worker = multiprocessing.Process(
+            target=parallel_worker_entry, name="worker%d" % index,
+            args=(index, worker_args, init_worker, cleanup_worker,
+                  work_queue, result_queue))
+        worker.start()
+        workers.append(worker)
+
+    stats = None
+    retry_policy = RetryPolicy(args.retry, TEST_CASE_DB)
+    run_count = {}
+    remaining = 0
+    running = {}  # worker index -> test case name
+
+    def handle_result(test_case_name, status, duration, settle_time=None):
+        regression = stats.update(test_case_name, duration, status,
+                                  settle_time)
+
+        print format_test_case_name(stats, test_case_name),
+        print_test_case_result(stats, run_count[test_case_name], status,
+                               duration, regression)
+        sys.stdout.flush()
+
+        if retry_policy.should_retry(test_case_name, status,
+                                     run_count[test_case_name]):
+            run_count[test_case_name] += 1
+            work_queue.put(test_case_name)
+            return 0
+
+        if TEST_CASE_DB:
+            TEST_CASE_DB.update_statistics(test_case_name, duration, status,
+                                           run_count[test_case_name])
+
+        stats.index += 1
+        return 1
+
+    while stats is None or remaining:
+        try:
+            msg = result_queue.get(timeout=1)
+        except Queue.Empty:
+            for index, worker in enumerate(workers):
+                if not worker.is_alive() and index in running:
+                    logging.error("Worker %d died running %s", index,
+                                  running[index])
+                    remaining -= handle_result(running.pop(index),
+                                               ptstypes.E_FATAL_ERROR, 0)
+
+            if not any(worker.is_alive() for worker in workers):
+                break
+
+            continue
+
+        if msg[0] == "ready" and stats is None:
+            projects, test_cases = msg[2], msg[3]
+            stats = TestCaseRunStats(projects, test_cases, args.retry,
+                                     TEST_CASE_DB)
+
+            # longest first, so that no worker is left with a long test
+            # case while others are idle
+            for test_case in shard_test_cases(test_cases, 1, TEST_CASE_DB)[0]:
+                work_queue.put(test_case)
+
+            run_count = dict.fromkeys(test_cases, 0)
+            remaining = len(test_cases)
+
+        elif msg[0] == "error":
+            print "Worker %d failed: %s" % (msg[1], msg[2])
+
+        elif msg[0] == "start":
+            running[msg[1]] = msg[2]
+
+        elif msg[0] == "result":
+            running.pop(msg[1], None)
+            remaining -= handle_result(*msg[2:])
+
+    for worker in workers:
+        work_queue.put(None)
+
+    for worker in workers:
+        worker.join(timeout=60)
+        if worker.is_alive():
+            worker.terminate()
+
+    if stats is None:
+        raise Exception("No parallel worker started")
+
+    if TEST_CASE_DB:
+        TEST_CASE_DB.flush()
+
+    stats.snapshot()
+    stats.print_summary()
+
+    return (stats.get_status_count(), stats.get_results(),
+            stats.get_regressions())
+
+
 class CliParser(argparse.ArgumentParser):
     def __init__(self, description):
         argparse.ArgumentParser.__init__(self, description=description)
@@ -973,3 +1531,23 @@ class CliParser(argparse.ArgumentParser):
         self.add_argument("-r", "--retry", type=int, default=0,
                           help="Repeat test if failed. Parameter specifies "
                                "maximum repeat count per test")
+
+        self.add_argument("--btp-capture", action='store_true',
+                          default=False,
+                          help="Save BTP frames of each test case to a "
+                               "capture file next to its log file. Use "
+                               "tools/btpreplay.py to replay it")
+
+        self.add_argument("--shard", type=parse_shard, default=None,
+                          metavar="K/N",
+                          help="Run only K-th of N parts of test cases, "
+                               "e.g. 2/3. Parts are balanced by test case "
+                               "durations of other IUT builds in "
+                               "TestCase.db, so each PTS server can run one "
+                               "part of the same list at the same time")
+
+        self.add_argument("--parallel", action='store_true', default=False,
+                          help="Run test cases on all PTS servers given "
+                               "with -i at the same time, each one with "
+                               "its own IUT. Test cases that need two PTS "
+                               "instances are not run in this mode")
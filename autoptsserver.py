@@ -41,6 +41,20 @@ from config import SERVER_PORT
 log = logging.debug
 
 
+class RequestHandler(xmlrpc.server.SimpleXMLRPCRequestHandler):
+    """Request handler that sends small responses without delay
+
+    Connection is closed after each request. The server handles one
+    connection at a time, as PTS COM objects are not used from other
+    threads, so an idle persistent connection of one client would block the
+    other ones. Batch calls with system.multicall instead.
+
+    """
+
+    # do not delay small responses waiting for ACK of the previous ones
+    disable_nagle_algorithm = True
+
+
 class PyPTSWithXmlRpcCallback(ptscontrol.PyPTS):
     """A child class that adds support of xmlrpc PTS callbacks to PyPTS"""
 
@@ -78,7 +92,7 @@ class PyPTSWithXmlRpcCallback(ptscontrol.PyPTS):
         log("Created XMR RPC auto-pts client proxy, provides methods: %s" %
             self.client_xmlrpc_proxy.system.listMethods())
 
-        self.register_ptscallback(self.client_xmlrpc_proxy)
+        self.register_ptscallback(self.client_xmlrpc_proxy, batch_logs=True)
 
     def unregister_xmlrpc_ptscallback(self):
         """Unregisters the client callback"""
@@ -117,9 +131,12 @@ def main():
 
     print("Serving on port {} ...".format(SERVER_PORT))
 
-    server = xmlrpc.server.SimpleXMLRPCServer(("", SERVER_PORT), allow_none=True)
+    server = xmlrpc.server.SimpleXMLRPCServer(
+        ("", SERVER_PORT), requestHandler=RequestHandler,
+        allow_none=True)
     server.register_instance(pts)
     server.register_introspection_functions()
+    server.register_multicall_functions()
     server.serve_forever()
 
 
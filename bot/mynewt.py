@@ -26,6 +26,7 @@ import ptsprojects.mynewt as autoprojects
 import ptsprojects.stack as stack
 from pybtp import btp
 from ptsprojects.mynewt.iutctl import get_iut
+from ptsprojects.testcase import TestCaseRegistry
 
 import bot.common
 
@@ -179,13 +180,19 @@ def make_repo_status(repos_info):
 def get_test_cases(ptses):
     """Get all test cases
     :param pts: PTS proxy instance
-    :return: ZTestCase list
+    :return: TestCaseRegistry building ZTestCases of project on first use
     """
-    test_cases = autoprojects.gap.test_cases(ptses[0])
-    test_cases += autoprojects.gatt.test_cases(ptses[0])
-    test_cases += autoprojects.sm.test_cases(ptses[0])
-    test_cases += autoprojects.l2cap.test_cases(ptses[0])
-    test_cases += autoprojects.mesh.test_cases(ptses)
+    test_cases = TestCaseRegistry()
+    test_cases.add_project(
+        "GAP", lambda: autoprojects.gap.test_cases(ptses[0]))
+    test_cases.add_project(
+        "GATT", lambda: autoprojects.gatt.test_cases(ptses[0]))
+    test_cases.add_project(
+        "SM", lambda: autoprojects.sm.test_cases(ptses[0]))
+    test_cases.add_project(
+        "L2CAP", lambda: autoprojects.l2cap.test_cases(ptses[0]))
+    test_cases.add_project(
+        "MESH", lambda: autoprojects.mesh.test_cases(ptses))
 
     return test_cases
 
@@ -202,6 +209,9 @@ class PtsInitArgs(object):
         self.bd_addr = args["bd_addr"]
         self.enable_max_logs = args["enable_max_logs"]
         self.retry = args["retry"]
+        self.btp_capture = args.get("btp_capture", False)
+        self.shard = autoptsclient.parse_shard(args["shard"]) \
+            if "shard" in args else None
         self.test_cases = []
         self.excluded = []
 
@@ -239,7 +249,8 @@ def run_tests(args, iut_config):
             _args[config_default].excluded += _args[config].test_cases
 
     ptses = autoptsclient.init_pts(_args[config_default], callback_thread,
-                                   "mynewt_" + str(args["board"]))
+                                   "mynewt_" + str(args["board"]),
+                                   args.get("iut_build"))
 
     btp.init(get_iut)
     # Main instance of PTS
@@ -288,10 +299,8 @@ def run_tests(args, iut_config):
         results.update(results_dict)
         autoprojects.iutctl.cleanup()
 
-    for test_case_name in results.keys():
-        project_name = test_case_name.split('/')[0]
-        descriptions[test_case_name] = \
-            pts.get_test_case_description(project_name, test_case_name)
+    descriptions.update(
+        autoptsclient.get_test_case_descriptions(pts, results.keys()))
 
     for pts in ptses:
         pts.unregister_xmlrpc_ptscallback()
@@ -340,6 +349,7 @@ def main(cfg):
 
     repos_info = bot.common.update_repos(args['project_path'], cfg["git"])
     repo_status = make_repo_status(repos_info)
+    args['iut_build'] = repo_status
 
     summary, results, descriptions, regressions = \
         run_tests(args, cfg.get('iut_config', {}))
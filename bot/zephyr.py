@@ -29,6 +29,7 @@ import ptsprojects.zephyr as autoprojects
 import ptsprojects.stack as stack
 from pybtp import btp
 from ptsprojects.zephyr.iutctl import get_iut
+from ptsprojects.testcase import TestCaseRegistry
 
 import bot.common
 
@@ -229,13 +230,19 @@ def get_tty_path(name):
 def get_test_cases(ptses):
     """Get all test cases
     :param pts: PTS proxy instance
-    :return: ZTestCase list
+    :return: TestCaseRegistry building ZTestCases of project on first use
     """
-    test_cases = autoprojects.gap.test_cases(ptses[0])
-    test_cases += autoprojects.gatt.test_cases(ptses)
-    test_cases += autoprojects.sm.test_cases(ptses[0])
-    test_cases += autoprojects.l2cap.test_cases(ptses[0])
-    test_cases += autoprojects.mesh.test_cases(ptses)
+    test_cases = TestCaseRegistry()
+    test_cases.add_project(
+        "GAP", lambda: autoprojects.gap.test_cases(ptses[0]))
+    test_cases.add_project(
+        "GATT", lambda: autoprojects.gatt.test_cases(ptses))
+    test_cases.add_project(
+        "SM", lambda: autoprojects.sm.test_cases(ptses[0]))
+    test_cases.add_project(
+        "L2CAP", lambda: autoprojects.l2cap.test_cases(ptses[0]))
+    test_cases.add_project(
+        "MESH", lambda: autoprojects.mesh.test_cases(ptses))
 
     return test_cases
 
@@ -252,6 +259,9 @@ class PtsInitArgs(object):
         self.bd_addr = args["bd_addr"]
         self.enable_max_logs = args["enable_max_logs"]
         self.retry = args["retry"]
+        self.btp_capture = args.get("btp_capture", False)
+        self.shard = autoptsclient.parse_shard(args["shard"]) \
+            if "shard" in args else None
         self.test_cases = []
         self.excluded = []
 
@@ -285,7 +295,8 @@ def run_tests(args, iut_config):
         _args[config_default].excluded += _args[config].test_cases
 
     ptses = autoptsclient.init_pts(_args[config_default], callback_thread,
-                                   "zephyr_" + str(args["board"]))
+                                   "zephyr_" + str(args["board"]),
+                                   args.get("iut_build"))
 
     btp.init(get_iut)
     # Main instance of PTS
@@ -312,7 +323,8 @@ def run_tests(args, iut_config):
         flush_serial(tty)
         time.sleep(10)
 
-        autoprojects.iutctl.init(args["kernel_image"], tty, args["board"])
+        autoprojects.iutctl.init(args["kernel_image"], tty, args["board"],
+                                 args.get("warm_iut", False))
 
         # Setup project PIXITS
         autoprojects.gap.set_pixits(ptses[0])
@@ -336,10 +348,8 @@ def run_tests(args, iut_config):
         results.update(results_dict)
         autoprojects.iutctl.cleanup()
 
-    for test_case_name in results.keys():
-        project_name = test_case_name.split('/')[0]
-        descriptions[test_case_name] = \
-            pts.get_test_case_description(project_name, test_case_name)
+    descriptions.update(
+        autoptsclient.get_test_case_descriptions(pts, results.keys()))
 
     for pts in ptses:
         pts.unregister_xmlrpc_ptscallback()
@@ -406,6 +416,7 @@ def main(cfg):
 
     zephyr_hash = bot.common.update_repos(args['project_path'],
                                           cfg["git"])['zephyr']
+    args['iut_build'] = zephyr_hash["commit"]
 
     summary, results, descriptions, regressions = \
         run_tests(args, cfg.get('iut_config', {}))
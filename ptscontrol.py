@@ -36,9 +36,11 @@ Cause of tight coupling with PTS, this module is Windows specific
 import os
 import wmi
 import sys
+import collections
 import time
 import logging
 import argparse
+import threading
 import shutil
 import win32com.client
 import win32com.server.connect
@@ -55,6 +57,13 @@ logtype_whitelist = [ptstypes.PTS_LOGTYPE_START_TEST,
                      ptstypes.PTS_LOGTYPE_ERROR,
                      ptstypes.PTS_LOGTYPE_FINAL_VERDICT]
 
+# maximum number of log records sent to the callback in one call
+LOG_BATCH_SIZE = 64
+
+# maximum time in seconds a log record waits for the next ones to be sent with
+# them
+LOG_BATCH_INTERVAL = 1.0
+
 
 class PTSLogger(win32com.server.connect.ConnectableServer):
     """PTS control client logger callback implementation"""
@@ -68,16 +77,74 @@ class PTSLogger(win32com.server.connect.ConnectableServer):
         super(PTSLogger, self).__init__()
 
         self._callback = None
+        self._batch_logs = False
         self._maximum_logging = False
         self._test_case_name = None
 
-    def set_callback(self, callback):
-        """Set the callback"""
+        # records waiting to be sent with callback log_batch
+        self._records = []
+        # flushes records LOG_BATCH_INTERVAL after the first of them
+        self._flush_timer = None
+        # exception of flush that failed out of flush caller's thread
+        self._flush_error = None
+
+        # guards _records, _flush_timer and _flush_error
+        self._records_lock = threading.Lock()
+        # held while the callback proxy is called, flush timer calls it from
+        # its own thread
+        self.proxy_lock = threading.Lock()
+
+    def set_callback(self, callback, batch_logs=False):
+        """Set the callback
+
+        batch_logs -- send log records in batches with callback log_batch
+                      instead of calling callback log for each of them
+        """
         self._callback = callback
+        self._batch_logs = batch_logs
 
     def unset_callback(self):
         """Unset the callback"""
-        self._callback = None
+        with self._records_lock:
+            self._cancel_flush_timer()
+            self._callback = None
+            self._records = []
+            self._flush_error = None
+
+    def _cancel_flush_timer(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def flush(self):
+        """Send waiting log records to the callback
+
+        Raises exception of the callback, also the one raised when records
+        were flushed from other thread since the last flush.
+        """
+        # records are taken under proxy_lock to be sent in order
+        with self.proxy_lock:
+            with self._records_lock:
+                self._cancel_flush_timer()
+                records, self._records = self._records, []
+                error, self._flush_error = self._flush_error, None
+
+            if error is not None:
+                raise error
+
+            if not records or self._callback is None:
+                return
+
+            self._callback.log_batch(records)
+
+    def _flush_keep_error(self):
+        """Flush, keeping exception for the next flush to raise"""
+        try:
+            self.flush()
+        except Exception as e:
+            logging.exception(repr(e))
+            with self._records_lock:
+                self._flush_error = e
 
     def enable_maximum_logging(self, enable):
         """Enable/disable maximum logging"""
@@ -103,11 +170,35 @@ class PTSLogger(win32com.server.connect.ConnectableServer):
 
         log("%d %s %s %s" % (log_type, logtype_string, log_time, log_message))
 
+        if self._callback is None or not (
+                self._maximum_logging or log_type in logtype_whitelist):
+            return
+
+        if self._batch_logs:
+            with self._records_lock:
+                self._records.append((log_type, logtype_string, log_time,
+                                      log_message, self._test_case_name))
+
+                # client waits for the final verdict to finish the test case
+                flush_now = log_type == ptstypes.PTS_LOGTYPE_FINAL_VERDICT or \
+                    len(self._records) >= LOG_BATCH_SIZE
+
+                if not flush_now and self._flush_timer is None:
+                    self._flush_timer = threading.Timer(
+                        LOG_BATCH_INTERVAL, self._flush_keep_error)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+
+            # errors are raised by flush of run_test_case
+            if flush_now:
+                self._flush_keep_error()
+
+            return
+
         try:
-            if self._callback is not None:
-                if self._maximum_logging or log_type in logtype_whitelist:
-                    self._callback.log(log_type, logtype_string, log_time,
-                                       log_message, self._test_case_name)
+            with self.proxy_lock:
+                self._callback.log(log_type, logtype_string, log_time,
+                                   log_message, self._test_case_name)
         except Exception as e:
             logging.exception(repr(e))
             sys.exit("Exception in Log")
@@ -120,11 +211,22 @@ class PTSSender(win32com.server.connect.ConnectableServer):
     _reg_progid_ = "autopts.PTSSender"
     _public_methods_ = ['OnImplicitSend'] + win32com.server.connect.ConnectableServer._public_methods_
 
-    def __init__(self):
-        """"Constructor"""
+    def __init__(self, pts_logger=None):
+        """"Constructor
+
+        pts_logger -- PTSLogger to flush before the callback is called, so
+                      that the client gets log records preceding the MMI first.
+                      The callback is not called while pts_logger calls it.
+        """
         super(PTSSender, self).__init__()
 
         self._callback = None
+        self._pts_logger = pts_logger
+
+        if pts_logger is not None:
+            self._proxy_lock = pts_logger.proxy_lock
+        else:
+            self._proxy_lock = threading.Lock()
 
     def set_callback(self, callback):
         """Sets the callback"""
@@ -165,15 +267,18 @@ class PTSSender(win32com.server.connect.ConnectableServer):
 
         try:
             if self._callback is not None:
+                if self._pts_logger is not None:
+                    self._pts_logger.flush()
+
                 log("Calling callback.on_implicit_send")
-                rsp = self._callback.on_implicit_send(project_name, wid,
-                                                      test_case, description,
-                                                      style)
+                with self._proxy_lock:
+                    rsp = self._callback.on_implicit_send(
+                        project_name, wid, test_case, description, style)
 
                 # Don't block xml-rpc
                 if rsp == "WAIT":
-                    rsp = self._callback.get_pending_response(
-                        test_case)
+                    with self._proxy_lock:
+                        rsp = self._callback.get_pending_response(test_case)
                     while not rsp:
                         # XXX: Ask for response every second
                         timer = timer + 1
@@ -184,7 +289,9 @@ class PTSSender(win32com.server.connect.ConnectableServer):
 
                         log("Rechecking response...")
                         time.sleep(1)
-                        rsp = self._callback.get_pending_response(test_case)
+                        with self._proxy_lock:
+                            rsp = self._callback.get_pending_response(
+                                test_case)
 
                 log("callback returned on_implicit_send, respose: %r", rsp)
 
@@ -247,11 +354,24 @@ class PyPTS:
 
         self._init_attributes()
 
-        # list of tuples of methods and arguments to recover after PTS restart
-        self._recov = []
-        self._temp_changes = []
+        # methods and their arguments to recover after PTS restart, one
+        # element per method, in order of their last calls
+        self._recov = collections.OrderedDict()
+        # PIXITs set for single test case, (project name, PIXIT name)
+        self._temp_changes = set()
         self._recov_in_progress = False
 
+        # Shadow of workspace PIXITs and PICS set by client: project name to
+        # dictionary of names and values. After PTS restart only values that
+        # differ from workspace defaults are set again.
+        self._pixits_shadow = {}
+        self._pics_shadow = {}
+        # (project, name) to values known to be workspace defaults, PTS
+        # refuses to update those
+        self._pixit_defaults = {}
+        self._pics_defaults = {}
+        self._workspace_path = None
+
         self._temp_workspace_path = None
 
         # This is done to have valid _pts in case client does not restart_pts
@@ -282,57 +402,38 @@ class PyPTS:
 
         self._pts_projects = {}
 
+        # (project, name) to values of PIXITs and PICS set in this PTS
+        # instance, used to skip updates that do not change anything
+        self._pixit_values = {}
+        self._pics_values = {}
+
     def add_recov(self, func, *args, **kwds):
-        """Add function to recovery list"""
+        """Add function to recovery list
+
+        Only the last call of func is kept.
+        """
         if self._recov_in_progress:
             return
 
         log("%s %r %r %r", self.add_recov.__name__, func, args, kwds)
 
-        # Re-set recovery element to avoid duplications
-        if func == self.set_pixit:
-            profile = args[0]
-            pixit = args[1]
-            # Look for possible re-setable PIXIT
-            try:
-                '''Search for matching recover function, PIXIT and recover
-                if value was changed. '''
-                item = next(x for x in self._recov if ((x[0] ==
-                            self.set_pixit) and (x[1][0] == profile) and
-                            (x[1][1] == pixit)))
-
-                self._recov.remove(item)
-                log("%s, re-set pixit: %s", self.add_recov.__name__, pixit)
-
-            except StopIteration:
-                pass
-
-        self._recov.append((func, args, kwds))
-
-    def _add_temp_change(self, func, *args, **kwds):
-        """Add function to set temporary value"""
-        if not self._recov_in_progress:
-            log("%s %r %r %r", self._add_temp_change.__name__, func, args, kwds)
-            self._temp_changes.append((func, args, kwds))
+        # moved to the end, so that it is recovered in order of last calls
+        self._recov.pop(func, None)
+        self._recov[func] = (args, kwds)
 
     def del_recov(self, func, *args, **kwds):
-        """Remove function from recovery list"""
-        log("%s %r %r %r", self.del_recov.__name__, func, args, kwds)
+        """Remove function from recovery list
 
-        recov_funcs = [item[0] for item in self._recov]
+        If arguments are specified, function is removed only if it was
+        added with the same arguments.
+        """
+        log("%s %r %r %r", self.del_recov.__name__, func, args, kwds)
 
-        if func not in recov_funcs:
+        if func not in self._recov:
             return
 
-        # no arguments specified: remove all method calls
-        if not args and not kwds:
-            self._recov = [item for item in self._recov if item[0] != func]
-
-        # remove single method call with matching arguments
-        else:
-            item = (func, args, kwds)
-            if item in self._recov:
-                self._recov.remove(item)
+        if (not args and not kwds) or self._recov[func] == (args, kwds):
+            del self._recov[func]
 
     def _recover_item(self, item):
         """Recovery item wraper"""
@@ -345,6 +446,21 @@ class PyPTS:
 
         func(*args, **kwds)
 
+    def _recover_workspace_values(self):
+        """Set PIXITs and PICS of shadow workspace that differ from workspace
+        defaults"""
+        for project_name, pixits in self._pixits_shadow.items():
+            for param_name, param_value in pixits.items():
+                key = (project_name, param_name)
+                if self._pixit_defaults.get(key) != param_value:
+                    self._update_pixit(project_name, param_name, param_value)
+
+        for project_name, pics in self._pics_shadow.items():
+            for entry_name, bool_value in pics.items():
+                key = (project_name, entry_name)
+                if self._pics_defaults.get(key) != bool_value:
+                    self._update_pics(project_name, entry_name, bool_value)
+
     def recover_pts(self):
         """Recovers PTS from errors occured during RunTestCase call.
 
@@ -368,8 +484,10 @@ class PyPTS:
 
         self.restart_pts()
 
-        for item in self._recov:
-            self._recover_item(item)
+        for func, (args, kwds) in list(self._recov.items()):
+            self._recover_item((func, args, kwds))
+
+        self._recover_workspace_values()
 
         self._recov_in_progress = False
 
@@ -420,7 +538,7 @@ class PyPTS:
         log("Started new PTS daemon with pid: %d" % self._pts_proc.ProcessId)
 
         self._pts_logger = PTSLogger()
-        self._pts_sender = PTSSender()
+        self._pts_sender = PTSSender(self._pts_logger)
 
         # cached frequently used PTS attributes: due to optimisation reasons it
         # is avoided to contact PTS. These attributes should not change anyway.
@@ -518,6 +636,14 @@ class PyPTS:
         log("Using temporary workspace: %s", self._temp_workspace_path)
 
         self._pts.OpenWorkspace(self._temp_workspace_path)
+        self._pixit_values.clear()
+        self._pics_values.clear()
+
+        if workspace_path != self._workspace_path:
+            self._pixit_defaults.clear()
+            self._pics_defaults.clear()
+            self._workspace_path = workspace_path
+
         self.add_recov(self.open_workspace, workspace_path)
         self._cache_test_cases()
 
@@ -570,27 +696,15 @@ class PyPTS:
 
         log("%s", self._revert_temp_changes.__name__)
 
-        self._recov_in_progress = True
-
-        for tch in self._temp_changes:
-            func = tch[0]
+        for project_name, param_name in self._temp_changes:
+            key = (project_name, param_name)
+            param_value = self._pixits_shadow.get(project_name, {}).get(
+                param_name, self._pixit_defaults.get(key))
 
-            if func == self.update_pixit_param:
-                # Look for possible recoverable parameter
-                try:
-                    '''Search for matching recover function, PIXIT and recover
-                    if value was changed. '''
-                    item = next(x for x in self._recov if ((x[0] ==
-                                self.set_pixit) and (x[1][0] ==
-                                tch[1][0]) and (x[1][1] == tch[1][1])))
+            if param_value is not None:
+                self._update_pixit(project_name, param_name, param_value)
 
-                    self._recover_item(item)
-
-                except StopIteration:
-                    continue
-
-        self._recov_in_progress = False
-        self._temp_changes = []
+        self._temp_changes.clear()
 
     def run_test_case(self, project_name, test_case_name):
         """Executes the specified Test Case.
@@ -609,12 +723,17 @@ class PyPTS:
         try:
             self._pts.RunTestCase(project_name, test_case_name)
 
+            self._pts_logger.flush()
             self._revert_temp_changes()
 
         except pythoncom.com_error as e:
             error_code = parse_ptscontrol_error(e)
 
-            self.recover_pts()
+            # restart of PTS replaces the logger with its waiting records
+            try:
+                self._pts_logger.flush()
+            finally:
+                self.recover_pts()
 
         log("Done %s %s %s out: %s", self.run_test_case.__name__,
             project_name, test_case_name, error_code)
@@ -641,6 +760,27 @@ class PyPTS:
 
         return self._pts.GetTestCasesFromTSSFile(project_name)
 
+    def _update_pics(self, project_name, entry_name, bool_value):
+        """Update PICS entry in PTS
+
+        Returns True if PTS has now the entry set to bool_value
+        """
+        key = (project_name, entry_name)
+
+        try:
+            self._pts.UpdatePics(project_name, entry_name, bool_value)
+
+        except pythoncom.com_error as e:
+            if parse_ptscontrol_error(e) != \
+                    "PTSCONTROL_E_PICS_ENTRY_NOT_CHANGED":
+                return False
+
+            self._pics_defaults[key] = bool_value
+
+        self._pics_values[key] = bool_value
+
+        return True
+
     def set_pics(self, project_name, entry_name, bool_value):
         """Set PICS
 
@@ -659,13 +799,49 @@ class PyPTS:
         log("%s %s %s %s", self.set_pics.__name__, project_name,
             entry_name, bool_value)
 
+        if self._update_pics(project_name, entry_name, bool_value):
+            self._pics_shadow.setdefault(project_name, {})[entry_name] = \
+                bool_value
+
+    def set_pics_bulk(self, project_name, pics):
+        """Set PICS entries of project in one call
+
+        Same as set_pics called for each of the entries, but entries already
+        set to the same value are skipped.
+
+        pics -- dictionary of PICS entry names and bool values
+
+        """
+        log("%s %s %r", self.set_pics_bulk.__name__, project_name, pics)
+
+        shadow = self._pics_shadow.setdefault(project_name, {})
+
+        for entry_name, bool_value in pics.items():
+            if self._pics_values.get((project_name, entry_name)) == \
+                    bool_value or \
+                    self._update_pics(project_name, entry_name, bool_value):
+                shadow[entry_name] = bool_value
+
+    def _update_pixit(self, project_name, param_name, param_value):
+        """Update PIXIT in PTS
+
+        Returns True if PTS has now the PIXIT set to param_value
+        """
+        key = (project_name, param_name)
+
         try:
-            self._pts.UpdatePics(project_name, entry_name, bool_value)
-            self.add_recov(self.set_pics, project_name, entry_name,
-                           bool_value)
+            self._pts.UpdatePixitParam(project_name, param_name, param_value)
 
         except pythoncom.com_error as e:
-            parse_ptscontrol_error(e)
+            if parse_ptscontrol_error(e) != \
+                    "PTSCONTROL_E_PIXIT_PARAM_NOT_CHANGED":
+                return False
+
+            self._pixit_defaults[key] = param_value
+
+        self._pixit_values[key] = param_value
+
+        return True
 
     def set_pixit(self, project_name, param_name, param_value):
         """Set PIXIT
@@ -685,13 +861,28 @@ class PyPTS:
         log("%s %s %s %s", self.set_pixit.__name__, project_name,
             param_name, param_value)
 
-        try:
-            self._pts.UpdatePixitParam(project_name, param_name, param_value)
-            self.add_recov(self.set_pixit, project_name, param_name,
-                           param_value)
+        if self._update_pixit(project_name, param_name, param_value):
+            self._pixits_shadow.setdefault(project_name, {})[param_name] = \
+                param_value
 
-        except pythoncom.com_error as e:
-            parse_ptscontrol_error(e)
+    def set_pixits_bulk(self, project_name, pixits):
+        """Set PIXITs of project in one call
+
+        Same as set_pixit called for each of the PIXITs, but PIXITs already
+        set to the same value are skipped.
+
+        pixits -- dictionary of PIXIT names and values
+
+        """
+        log("%s %s %r", self.set_pixits_bulk.__name__, project_name, pixits)
+
+        shadow = self._pixits_shadow.setdefault(project_name, {})
+
+        for param_name, param_value in pixits.items():
+            if self._pixit_values.get((project_name, param_name)) == \
+                    param_value or \
+                    self._update_pixit(project_name, param_name, param_value):
+                shadow[param_name] = param_value
 
     def update_pixit_param(self, project_name, param_name, new_param_value):
         """Updates PIXIT
@@ -705,18 +896,14 @@ class PyPTS:
         In C++ HRESULT error with this value is returned:
         PTSCONTROL_E_PIXIT_PARAM_NOT_CHANGED (0x849C0021)
 
+        The change is reverted after the test case is run.
+
         """
         log("%s %s %s %s", self.update_pixit_param.__name__, project_name,
             param_name, new_param_value)
 
-        try:
-            self._pts.UpdatePixitParam(
-                project_name, param_name, new_param_value)
-            self._add_temp_change(self.update_pixit_param, project_name,
-                                  param_name)
-
-        except pythoncom.com_error as e:
-            parse_ptscontrol_error(e)
+        if self._update_pixit(project_name, param_name, new_param_value):
+            self._temp_changes.add((project_name, param_name))
 
     def enable_maximum_logging(self, enable):
         """Enables/disables the maximum logging."""
@@ -766,16 +953,22 @@ class PyPTS:
 
         return self._pts.GetPTSVersion()
 
-    def register_ptscallback(self, callback):
+    def register_ptscallback(self, callback, batch_logs=False):
         """Registers testcase.PTSCallback instance to be used as PTS log and
-        implicit send callback"""
+        implicit send callback
+
+        batch_logs -- callback implements log_batch, use it to send log records
+                      in batches
+        """
 
-        log("%s %s", self.register_ptscallback.__name__, callback)
+        log("%s %s %s", self.register_ptscallback.__name__, callback,
+            batch_logs)
 
-        self._pts_logger.set_callback(callback)
+        self._pts_logger.set_callback(callback, batch_logs)
         self._pts_sender.set_callback(callback)
 
-        self.add_recov(self.register_ptscallback, callback)
+        self.add_recov(self.register_ptscallback, callback,
+                       batch_logs=batch_logs)
 
     def unregister_ptscallback(self):
         """Unregisters the testcase.PTSCallback callback"""
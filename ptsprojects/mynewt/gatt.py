@@ -138,25 +138,27 @@ def set_pixits(pts):
 
     pts -- Instance of PyPTS"""
 
-    pts.set_pixit("GATT", "TSPX_bd_addr_iut", "DEADBEEFDEAD")
-    pts.set_pixit("GATT", "TSPX_iut_device_name_in_adv_packet_for_random_address", "")
-    pts.set_pixit("GATT", "TSPX_security_enabled", "FALSE")
-    pts.set_pixit("GATT", "TSPX_delete_link_key", "TRUE")
-    pts.set_pixit("GATT", "TSPX_time_guard", "180000")
-    pts.set_pixit("GATT", "TSPX_selected_handle", "0012")
-    pts.set_pixit("GATT", "TSPX_use_implicit_send", "TRUE")
-    pts.set_pixit("GATT", "TSPX_secure_simple_pairing_pass_key_confirmation", "FALSE")
-    pts.set_pixit("GATT", "TSPX_iut_use_dynamic_bd_addr", "FALSE")
-    pts.set_pixit("GATT", "TSPX_iut_setup_att_over_br_edr", "FALSE")
-    pts.set_pixit("GATT", "TSPX_tester_database_file",
-                  "C:\Program Files\Bluetooth SIG\Bluetooth PTS\Data\SIGDatabase\GATT_Qualification_Test_Databases.xml")
-    pts.set_pixit("GATT", "TSPX_iut_is_client_periphral", "FALSE")
-    pts.set_pixit("GATT", "TSPX_iut_is_server_central", "FALSE")
-    pts.set_pixit("GATT", "TSPX_mtu_size", "23")
-    pts.set_pixit("GATT", "TSPX_pin_code", "0000")
-    pts.set_pixit("GATT", "TSPX_use_dynamic_pin", "FALSE")
-    pts.set_pixit("GATT", "TSPX_delete_ltk", "TRUE")
-    pts.set_pixit("GATT", "TSPX_tester_appearance", "0000")
+    pts.set_pixits_bulk("GATT", {
+        "TSPX_bd_addr_iut": "DEADBEEFDEAD",
+        "TSPX_iut_device_name_in_adv_packet_for_random_address": "",
+        "TSPX_security_enabled": "FALSE",
+        "TSPX_delete_link_key": "TRUE",
+        "TSPX_time_guard": "180000",
+        "TSPX_selected_handle": "0012",
+        "TSPX_use_implicit_send": "TRUE",
+        "TSPX_secure_simple_pairing_pass_key_confirmation": "FALSE",
+        "TSPX_iut_use_dynamic_bd_addr": "FALSE",
+        "TSPX_iut_setup_att_over_br_edr": "FALSE",
+        "TSPX_tester_database_file":
+            "C:\Program Files\Bluetooth SIG\Bluetooth PTS\Data\SIGDatabase\GATT_Qualification_Test_Databases.xml",
+        "TSPX_iut_is_client_periphral": "FALSE",
+        "TSPX_iut_is_server_central": "FALSE",
+        "TSPX_mtu_size": "23",
+        "TSPX_pin_code": "0000",
+        "TSPX_use_dynamic_pin": "FALSE",
+        "TSPX_delete_ltk": "TRUE",
+        "TSPX_tester_appearance": "0000",
+    })
 
 
 def test_cases_server(pts):
@@ -168,25 +170,23 @@ def test_cases_server(pts):
     pre_conditions_1 = [TestFunc(btp.core_reg_svc_gap),
                       TestFunc(btp.core_reg_svc_gatt),
                       TestFunc(btp.gap_read_ctrl_info),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "GATT", "TSPX_bd_addr_iut",
-                          stack.gap.iut_addr_get_str())),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "GATT", "TSPX_iut_use_dynamic_bd_addr",
-                          "TRUE" if stack.gap.iut_addr_is_random()
-                          else "FALSE")),
+                      TestFunc(lambda: update_pixit_params(pts, "GATT", {
+                          "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+                          "TSPX_iut_use_dynamic_bd_addr":
+                              "TRUE" if stack.gap.iut_addr_is_random()
+                              else "FALSE",
+                      })),
                       TestFunc(stack.gatt_init)]
 
     pre_conditions_2 = [TestFunc(btp.core_reg_svc_gap),
                       TestFunc(btp.core_reg_svc_gatt),
                       TestFunc(btp.gap_read_ctrl_info),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "GATT", "TSPX_bd_addr_iut",
-                          stack.gap.iut_addr_get_str())),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "GATT", "TSPX_iut_use_dynamic_bd_addr",
-                          "TRUE" if stack.gap.iut_addr_is_random()
-                          else "FALSE")),
+                      TestFunc(lambda: update_pixit_params(pts, "GATT", {
+                          "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+                          "TSPX_iut_use_dynamic_bd_addr":
+                              "TRUE" if stack.gap.iut_addr_is_random()
+                              else "FALSE",
+                      })),
                       TestFunc(btp.gap_set_gendiscov),
                       TestFunc(btp.gap_set_conn)]
 
@@ -17,7 +17,7 @@
 
 try:
     from ptsprojects.testcase import TestCase, TestCmd, TestFunc, \
-        TestFuncCleanUp
+        TestFuncCleanUp, update_pixit_params
     from ptsprojects.mynewt.ztestcase import ZTestCase
 
 except ImportError:  # running this module as script
@@ -25,7 +25,7 @@ except ImportError:  # running this module as script
     sys.path.append("../..")  # to be able to locate the following imports
 
     from ptsprojects.testcase import TestCase, TestCmd, TestFunc, \
-        TestFuncCleanUp
+        TestFuncCleanUp, update_pixit_params
     from ptsprojects.mynewt.ztestcase import ZTestCase
 
 from pybtp import btp
@@ -47,55 +47,57 @@ def set_pixits(pts):
 
     pts -- Instance of PyPTS"""
 
-    pts.set_pixit("L2CAP", "TSPX_bd_addr_iut", "DEADBEEFDEAD")
-    pts.set_pixit("L2CAP", "TSPX_bd_addr_iut_le", "DEADBEEFDEAD")
-    pts.set_pixit("L2CAP", "TSPX_client_class_of_device", "100104")
-    pts.set_pixit("L2CAP", "TSPX_server_class_of_device", "100104")
-    pts.set_pixit("L2CAP", "TSPX_security_enabled", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_delete_link_key", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_pin_code", "0000")
-    pts.set_pixit("L2CAP", "TSPX_flushto", "FFFF")
-    pts.set_pixit("L2CAP", "TSPX_inmtu", "02A0")
-    pts.set_pixit("L2CAP", "TSPX_no_fail_verdicts", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_outmtu", "02A0")
-    pts.set_pixit("L2CAP", "TSPX_tester_mps", "0017")
-    pts.set_pixit("L2CAP", "TSPX_tester_mtu", "02A0")
-    pts.set_pixit("L2CAP", "TSPX_iut_role_initiator", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_le_psm", format(le_psm, '04x'))
-    pts.set_pixit("L2CAP", "TSPX_psm", "0001")
-    pts.set_pixit("L2CAP", "TSPX_psm_unsupported", format(psm_unsupported, '04x'))
-    pts.set_pixit("L2CAP", "TSPX_psm_authentication_required", "00F2")
-    pts.set_pixit("L2CAP", "TSPX_psm_authorization_required", "00F3")
-    pts.set_pixit("L2CAP", "TSPX_psm_encryption_key_size_required", "00F4")
-    pts.set_pixit("L2CAP", "TSPX_time_guard", "180000")
-    pts.set_pixit("L2CAP", "TSPX_timer_ertx", "120000")
-    pts.set_pixit("L2CAP", "TSPX_timer_ertx_max", "300000")
-    pts.set_pixit("L2CAP", "TSPX_timer_ertx_min", "60000")
-    pts.set_pixit("L2CAP", "TSPX_timer_rtx", "10000")
-    pts.set_pixit("L2CAP", "TSPX_timer_rtx_min", "60000")
-    pts.set_pixit("L2CAP", "TSPX_timer_rtx_max", "1000")
-    pts.set_pixit("L2CAP", "TSPX_rfc_mode_tx_window_size", "08")
-    pts.set_pixit("L2CAP", "TSPX_rfc_mode_max_transmit", "03")
-    pts.set_pixit("L2CAP", "TSPX_rfc_mode_retransmission_timeout", "07D0")
-    pts.set_pixit("L2CAP", "TSPX_rfc_mode_monitor_timeout", "2EE0")
-    pts.set_pixit("L2CAP", "TSPX_rfc_mode_maximum_pdu_size", "02A0")
-    pts.set_pixit("L2CAP", "TSPX_extended_window_size", "0012")
-    pts.set_pixit("L2CAP", "TSPX_use_implicit_send", "TRUE")
-    pts.set_pixit("L2CAP", "TSPX_use_dynamic_pin", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_iut_SDU_size_in_bytes", "144")
-    pts.set_pixit("L2CAP", "TSPX_secure_simple_pairing_pass_key_confirmation", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_iut_address_type_random", "FALSE")
-    pts.set_pixit("L2CAP", "TSPX_tester_adv_interval_min", "0030")
-    pts.set_pixit("L2CAP", "TSPX_tester_adv_interval_max", "0050")
-    pts.set_pixit("L2CAP", "TSPX_tester_le_scan_interval", "0C80")
-    pts.set_pixit("L2CAP", "TSPX_tester_le_scan_window", "0C80")
-    pts.set_pixit("L2CAP", "TSPX_tester_conn_interval_min", "0028")
-    pts.set_pixit("L2CAP", "TSPX_tester_conn_interval_max", "0050")
-    pts.set_pixit("L2CAP", "TSPX_tester_conn_latency", "0000")
-    pts.set_pixit("L2CAP", "TSPX_tester_supervision_timeout", "00C8")
-    pts.set_pixit("L2CAP", "TSPX_tester_min_CE_length", "0050")
-    pts.set_pixit("L2CAP", "TSPX_tester_max_CE_length", "0C80")
-    pts.set_pixit("L2CAP", "TSPX_generate_local_busy", "TRUE")
+    pts.set_pixits_bulk("L2CAP", {
+        "TSPX_bd_addr_iut": "DEADBEEFDEAD",
+        "TSPX_bd_addr_iut_le": "DEADBEEFDEAD",
+        "TSPX_client_class_of_device": "100104",
+        "TSPX_server_class_of_device": "100104",
+        "TSPX_security_enabled": "FALSE",
+        "TSPX_delete_link_key": "FALSE",
+        "TSPX_pin_code": "0000",
+        "TSPX_flushto": "FFFF",
+        "TSPX_inmtu": "02A0",
+        "TSPX_no_fail_verdicts": "FALSE",
+        "TSPX_outmtu": "02A0",
+        "TSPX_tester_mps": "0017",
+        "TSPX_tester_mtu": "02A0",
+        "TSPX_iut_role_initiator": "FALSE",
+        "TSPX_le_psm": format(le_psm, '04x'),
+        "TSPX_psm": "0001",
+        "TSPX_psm_unsupported": format(psm_unsupported, '04x'),
+        "TSPX_psm_authentication_required": "00F2",
+        "TSPX_psm_authorization_required": "00F3",
+        "TSPX_psm_encryption_key_size_required": "00F4",
+        "TSPX_time_guard": "180000",
+        "TSPX_timer_ertx": "120000",
+        "TSPX_timer_ertx_max": "300000",
+        "TSPX_timer_ertx_min": "60000",
+        "TSPX_timer_rtx": "10000",
+        "TSPX_timer_rtx_min": "60000",
+        "TSPX_timer_rtx_max": "1000",
+        "TSPX_rfc_mode_tx_window_size": "08",
+        "TSPX_rfc_mode_max_transmit": "03",
+        "TSPX_rfc_mode_retransmission_timeout": "07D0",
+        "TSPX_rfc_mode_monitor_timeout": "2EE0",
+        "TSPX_rfc_mode_maximum_pdu_size": "02A0",
+        "TSPX_extended_window_size": "0012",
+        "TSPX_use_implicit_send": "TRUE",
+        "TSPX_use_dynamic_pin": "FALSE",
+        "TSPX_iut_SDU_size_in_bytes": "144",
+        "TSPX_secure_simple_pairing_pass_key_confirmation": "FALSE",
+        "TSPX_iut_address_type_random": "FALSE",
+        "TSPX_tester_adv_interval_min": "0030",
+        "TSPX_tester_adv_interval_max": "0050",
+        "TSPX_tester_le_scan_interval": "0C80",
+        "TSPX_tester_le_scan_window": "0C80",
+        "TSPX_tester_conn_interval_min": "0028",
+        "TSPX_tester_conn_interval_max": "0050",
+        "TSPX_tester_conn_latency": "0000",
+        "TSPX_tester_supervision_timeout": "00C8",
+        "TSPX_tester_min_CE_length": "0050",
+        "TSPX_tester_max_CE_length": "0C80",
+        "TSPX_generate_local_busy": "TRUE",
+    })
 
 
 def test_cases(pts):
@@ -111,16 +113,13 @@ def test_cases(pts):
     pre_conditions = [TestFunc(btp.core_reg_svc_gap),
                       TestFunc(btp.core_reg_svc_l2cap),
                       TestFunc(btp.gap_read_ctrl_info),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "L2CAP", "TSPX_bd_addr_iut",
-                          stack.gap.iut_addr_get_str())),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "L2CAP", "TSPX_bd_addr_iut_le",
-                          stack.gap.iut_addr_get_str())),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "L2CAP", "TSPX_iut_address_type_random",
-                          "TRUE" if stack.gap.iut_addr_is_random()
-                          else "FALSE")),
+                      TestFunc(lambda: update_pixit_params(pts, "L2CAP", {
+                          "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+                          "TSPX_bd_addr_iut_le": stack.gap.iut_addr_get_str(),
+                          "TSPX_iut_address_type_random":
+                              "TRUE" if stack.gap.iut_addr_is_random()
+                              else "FALSE",
+                      })),
                       TestFunc(btp.set_pts_addr, pts_bd_addr, Addr.le_public),
                       TestFunc(stack.l2cap_init, le_psm),
                       TestFunc(btp.l2cap_le_listen, le_psm)]
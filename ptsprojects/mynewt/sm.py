@@ -17,7 +17,7 @@
 
 try:
     from ptsprojects.testcase import TestCase, TestCmd, TestFunc, \
-        TestFuncCleanUp
+        TestFuncCleanUp, update_pixit_params
     from ptsprojects.mynewt.ztestcase import ZTestCase
 
 except ImportError:  # running this module as script
@@ -25,7 +25,7 @@ except ImportError:  # running this module as script
     sys.path.append("../..")  # to be able to locate the following imports
 
     from ptsprojects.testcase import TestCase, TestCmd, TestFunc, \
-        TestFuncCleanUp
+        TestFuncCleanUp, update_pixit_params
     from ptsprojects.mynewt.ztestcase import ZTestCase
 
 from pybtp import btp
@@ -43,69 +43,70 @@ def set_pixits(pts):
 
     pts -- Instance of PyPTS"""
 
-    pts.set_pixit("SM", "TSPX_bd_addr_iut", "DEADBEEFDEAD")
-    pts.set_pixit("SM", "TSPX_SMP_pin_code", "111111")
-    pts.set_pixit("SM", "TSPX_OOB_Data", "0000000000000000FE12036E5A889F4D")
-    pts.set_pixit("SM", "TSPX_peer_addr_type", "00")
-    pts.set_pixit("SM", "TSPX_own_addr_type", "00")
-    pts.set_pixit("SM", "TSPX_conn_interval_min", "0190")
-    pts.set_pixit("SM", "TSPX_conn_interval_max", "0190")
-    pts.set_pixit("SM", "TSPX_conn_latency", "0000")
-    pts.set_pixit("SM", "TSPX_client_class_of_device", "100104")
-    pts.set_pixit("SM", "TSPX_server_class_of_device", "100104")
-    pts.set_pixit("SM", "TSPX_security_enabled", "TRUE")
-    pts.set_pixit("SM", "TSPX_delete_link_key", "TRUE")
-    pts.set_pixit("SM", "TSPX_pin_code", "1234")
-    pts.set_pixit("SM", "TSPX_ATTR_HANDLE", "0000")
-    pts.set_pixit("SM", "TSPX_ATTR_VALUE", "0000000000000000")
-    pts.set_pixit("SM", "TSPX_delay_variation_in", "FFFFFFFF")
-    pts.set_pixit("SM", "TSPX_delay_variation_out", "FFFFFFFF")
-    pts.set_pixit("SM", "TSPX_flushto", "FFFF")
-    pts.set_pixit("SM", "TSPX_inmtu", "02A0")
-    pts.set_pixit("SM", "TSPX_inquiry_length", "17")
-    pts.set_pixit("SM", "TSPX_latency_in", "FFFFFFFF")
-    pts.set_pixit("SM", "TSPX_latency_out", "FFFFFFFF")
-    pts.set_pixit("SM", "TSPX_linkto", "3000")
-    pts.set_pixit("SM", "TSPX_max_nbr_retransmissions", "10")
-    pts.set_pixit("SM", "TSPX_no_fail_verdicts", "FALSE")
-    pts.set_pixit("SM", "TSPX_outmtu", "02A0")
-    pts.set_pixit("SM", "TSPX_tester_role_optional", "L2CAP_ROLE_INITIATOR")
-    pts.set_pixit("SM", "TSPX_page_scan_mode", "00")
-    pts.set_pixit("SM", "TSPX_page_scan_repetition_mode", "00")
-    pts.set_pixit("SM", "TSPX_peak_bandwidth_in", "00000000")
-    pts.set_pixit("SM", "TSPX_peak_bandwidth_out", "00000000")
-    pts.set_pixit("SM", "TSPX_psm", "0011")
-    pts.set_pixit("SM", "TSPX_service_type_in", "01")
-    pts.set_pixit("SM", "TSPX_service_type_out", "01")
-    pts.set_pixit("SM", "TSPX_support_retransmissions", "TRUE")
-    pts.set_pixit("SM", "TSPX_time_guard", "180000")
-    pts.set_pixit("SM", "TSPX_timer_ertx", "120000")
-    pts.set_pixit("SM", "TSPX_timer_ertx_max", "300000")
-    pts.set_pixit("SM", "TSPX_timer_ertx_min", "60000")
-    pts.set_pixit("SM", "TSPX_timer_rtx", "10000")
-    pts.set_pixit("SM", "TSPX_timer_rtx_max", "60000")
-    pts.set_pixit("SM", "TSPX_timer_rtx_min", "1000")
-    pts.set_pixit("SM", "TSPX_token_bucket_size_in", "00000000")
-    pts.set_pixit("SM", "TSPX_token_bucket_size_out", "00000000")
-    pts.set_pixit("SM", "TSPX_token_rate_in", "00000000")
-    pts.set_pixit("SM", "TSPX_token_rate_out", "00000000")
-    pts.set_pixit("SM", "TSPX_rfc_mode_mode", "03")
-    pts.set_pixit("SM", "TSPX_rfc_mode_tx_window_size", "08")
-    pts.set_pixit("SM", "TSPX_rfc_mode_max_transmit", "03")
-    pts.set_pixit("SM", "TSPX_rfc_mode_retransmission_timeout", "07D0")
-    pts.set_pixit("SM", "TSPX_rfc_mode_monitor_timeout", "2EE0")
-    pts.set_pixit("SM", "TSPX_rfc_mode_maximum_pdu_size", "02A0")
-    pts.set_pixit("SM", "TSPX_extended_window_size", "0012")
-    pts.set_pixit("SM", "TSPX_use_implicit_send", "TRUE")
-    pts.set_pixit("SM", "TSPX_use_dynamic_pin", "FALSE")
-    pts.set_pixit("SM", "TSPX_iut_SDU_size_in_bytes", "144")
-    pts.set_pixit("SM", "TSPX_secure_simple_pairing_pass_key_confirmation",
-                  "FALSE")
-    pts.set_pixit("SM", "TSPX_Min_Encryption_Key_Length", "07")
-    pts.set_pixit("SM", "TSPX_Bonding_Flags", "00")
-    pts.set_pixit("SM", "TSPX_delete_ltk", "FALSE")
-    pts.set_pixit("SM", "TSPX_mtu_size", "23")
-    pts.set_pixit("SM", "TSPX_new_key_failed_count", "0")
+    pts.set_pixits_bulk("SM", {
+        "TSPX_bd_addr_iut": "DEADBEEFDEAD",
+        "TSPX_SMP_pin_code": "111111",
+        "TSPX_OOB_Data": "0000000000000000FE12036E5A889F4D",
+        "TSPX_peer_addr_type": "00",
+        "TSPX_own_addr_type": "00",
+        "TSPX_conn_interval_min": "0190",
+        "TSPX_conn_interval_max": "0190",
+        "TSPX_conn_latency": "0000",
+        "TSPX_client_class_of_device": "100104",
+        "TSPX_server_class_of_device": "100104",
+        "TSPX_security_enabled": "TRUE",
+        "TSPX_delete_link_key": "TRUE",
+        "TSPX_pin_code": "1234",
+        "TSPX_ATTR_HANDLE": "0000",
+        "TSPX_ATTR_VALUE": "0000000000000000",
+        "TSPX_delay_variation_in": "FFFFFFFF",
+        "TSPX_delay_variation_out": "FFFFFFFF",
+        "TSPX_flushto": "FFFF",
+        "TSPX_inmtu": "02A0",
+        "TSPX_inquiry_length": "17",
+        "TSPX_latency_in": "FFFFFFFF",
+        "TSPX_latency_out": "FFFFFFFF",
+        "TSPX_linkto": "3000",
+        "TSPX_max_nbr_retransmissions": "10",
+        "TSPX_no_fail_verdicts": "FALSE",
+        "TSPX_outmtu": "02A0",
+        "TSPX_tester_role_optional": "L2CAP_ROLE_INITIATOR",
+        "TSPX_page_scan_mode": "00",
+        "TSPX_page_scan_repetition_mode": "00",
+        "TSPX_peak_bandwidth_in": "00000000",
+        "TSPX_peak_bandwidth_out": "00000000",
+        "TSPX_psm": "0011",
+        "TSPX_service_type_in": "01",
+        "TSPX_service_type_out": "01",
+        "TSPX_support_retransmissions": "TRUE",
+        "TSPX_time_guard": "180000",
+        "TSPX_timer_ertx": "120000",
+        "TSPX_timer_ertx_max": "300000",
+        "TSPX_timer_ertx_min": "60000",
+        "TSPX_timer_rtx": "10000",
+        "TSPX_timer_rtx_max": "60000",
+        "TSPX_timer_rtx_min": "1000",
+        "TSPX_token_bucket_size_in": "00000000",
+        "TSPX_token_bucket_size_out": "00000000",
+        "TSPX_token_rate_in": "00000000",
+        "TSPX_token_rate_out": "00000000",
+        "TSPX_rfc_mode_mode": "03",
+        "TSPX_rfc_mode_tx_window_size": "08",
+        "TSPX_rfc_mode_max_transmit": "03",
+        "TSPX_rfc_mode_retransmission_timeout": "07D0",
+        "TSPX_rfc_mode_monitor_timeout": "2EE0",
+        "TSPX_rfc_mode_maximum_pdu_size": "02A0",
+        "TSPX_extended_window_size": "0012",
+        "TSPX_use_implicit_send": "TRUE",
+        "TSPX_use_dynamic_pin": "FALSE",
+        "TSPX_iut_SDU_size_in_bytes": "144",
+        "TSPX_secure_simple_pairing_pass_key_confirmation": "FALSE",
+        "TSPX_Min_Encryption_Key_Length": "07",
+        "TSPX_Bonding_Flags": "00",
+        "TSPX_delete_ltk": "FALSE",
+        "TSPX_mtu_size": "23",
+        "TSPX_new_key_failed_count": "0",
+    })
 
 
 def test_cases(pts):
@@ -120,12 +121,11 @@ def test_cases(pts):
 
     pre_conditions = [TestFunc(btp.core_reg_svc_gap),
                       TestFunc(btp.gap_read_ctrl_info),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "SM", "TSPX_bd_addr_iut",
-                          stack.gap.iut_addr_get_str())),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "SM", "TSPX_peer_addr_type",
-                          "01" if stack.gap.iut_addr_is_random() else "00")),
+                      TestFunc(lambda: update_pixit_params(pts, "SM", {
+                          "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+                          "TSPX_peer_addr_type":
+                              "01" if stack.gap.iut_addr_is_random() else "00",
+                      })),
                       # FIXME Find better place to store PTS bdaddr
                       TestFunc(btp.set_pts_addr, pts_bd_addr, Addr.le_public)]
 
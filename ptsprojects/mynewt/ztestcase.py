@@ -15,6 +15,8 @@
 
 """Test case that manages Mynewt IUT"""
 
+import time
+
 from ptsprojects.testcase import TestCaseLT1, TestCaseLT2, TestFunc, \
     TestFuncCleanUp
 from ptsprojects.stack import get_stack
@@ -41,6 +43,19 @@ class ZTestCase(TestCaseLT1):
         # last command is to stop QEMU or HW
         self.cmds.append(TestFuncCleanUp(self.mynewtctl.stop))
 
+    def wait_settled(self, timeout):
+        """Wait till PTS is done and IUT is disconnected"""
+        deadline = time.time() + timeout
+
+        if not super(ZTestCase, self).wait_settled(timeout):
+            return False
+
+        gap = self.stack.gap
+        if not gap:
+            return True
+
+        return gap.wait_for_disconnection(deadline - time.time())
+
 
 class ZTestCaseSlave(TestCaseLT2):
     """A Mynewt helper test case that uses QEMU or HW as DUT"""
@@ -14,13 +14,18 @@
 #
 
 import logging
-from threading import Lock, Timer, Event
+import time
+from threading import Condition, Event
 from pybtp.types import AdType
+from pybtp.iutctl_common import DEADLINE_WAKER
 from binascii import hexlify
 
 
 STACK = None
 
+# maximum number of received bytes kept per L2CAP channel
+L2CAP_RX_BUFFER_LEN = 64 * 1024
+
 
 class GattAttribute:
     def __init__(self, handle, perm, uuid, att_rsp):
@@ -78,21 +83,58 @@ class GattDB:
 
 
 class Property(object):
+    """Value that can be waited for
+
+    Setting data wakes up threads waiting in wait_for. If data is changed in
+    place, e.g. list is appended, call notify.
+
+    """
+
     def __init__(self, data):
-        self._lock = Lock()
-        self.data = data
+        self._cond = Condition()
+        self._data = data
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        with self._cond:
+            self._data = value
+            self._cond.notify_all()
+
+    def notify(self):
+        """Wake up waiters after data was changed in place"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_for(self, predicate, timeout):
+        """Wait till predicate(data) is true or timeout expires
+
+        Condition.wait with timeout polls on Python 2, so waiters are woken
+        up by DEADLINE_WAKER at the deadline instead.
 
-    def __get__(self, instance, owner):
-        with self._lock:
-            return getattr(instance, self.data)
+        Returns last result of predicate
+        """
+        with self._cond:
+            result = predicate(self._data)
+            if result:
+                return result
 
-    def __set__(self, instance, value):
-        with self._lock:
-            setattr(instance, self.data, value)
+        deadline = time.time() + timeout
+        wakeup = DEADLINE_WAKER.add(deadline, self.notify)
 
+        try:
+            with self._cond:
+                result = predicate(self._data)
+                while not result and time.time() < deadline:
+                    self._cond.wait()
+                    result = predicate(self._data)
+        finally:
+            DEADLINE_WAKER.cancel(wakeup)
 
-def timeout_cb(flag):
-    flag.clear()
+        return result
 
 
 class ConnParams:
@@ -155,38 +197,11 @@ class Gap:
         self.conn_params = Property(None)
 
     def wait_for_connection(self, timeout):
-        if self.is_connected():
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            if self.is_connected():
-                t.cancel()
-                return True
-
-        return False
+        return self.connected.wait_for(lambda addr: addr is not None,
+                                       timeout)
 
     def wait_for_disconnection(self, timeout):
-        if not self.is_connected():
-            return True
-
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
-
-        while flag.is_set():
-            if not self.is_connected():
-                t.cancel()
-                return True
-
-        return False
+        return self.connected.wait_for(lambda addr: addr is None, timeout)
 
     def is_connected(self):
         return False if (self.connected.data is None) else True
@@ -236,16 +251,7 @@ class Gap:
 
     def get_passkey(self, timeout=5):
         if self.passkey.data is None:
-            flag = Event()
-            flag.set()
-
-            t = Timer(timeout, timeout_cb, [flag])
-            t.start()
-
-            while flag.is_set():
-                if self.passkey.data:
-                    t.cancel()
-                    break
+            self.passkey.wait_for(bool, timeout)
 
         return self.passkey.data
 
@@ -309,21 +315,92 @@ class Mesh:
         self.proxy_identity = True
 
     def wait_for_incomp_timer_exp(self, timeout):
-        if self.incomp_timer_exp.data:
-            return True
+        return self.incomp_timer_exp.wait_for(bool, timeout)
 
-        flag = Event()
-        flag.set()
 
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
+class L2capRxBuffer(object):
+    """Data received on L2CAP channel
 
-        while flag.is_set():
-            if self.incomp_timer_exp.data:
-                t.cancel()
-                return True
+    Keeps at most max_len last received bytes. Data can also be verified
+    against expected data, see expect.
 
-        return False
+    """
+
+    def __init__(self, max_len=L2CAP_RX_BUFFER_LEN):
+        self.buf = bytearray()
+        self.max_len = max_len
+        # number of all bytes received
+        self.rx_count = 0
+
+        self.expected = None
+        self.expected_offset = 0
+        self.mismatch = False
+        self.discard_verified = False
+
+    def __len__(self):
+        return len(self.buf)
+
+    def expect(self, expected, discard=False):
+        """Verify received data against expected
+
+        Data already in the buffer is verified first, then data received from
+        now on, as it is received. Received data has to be exactly the
+        expected data, any more data is a mismatch.
+
+        expected - expected data, None to stop verifying
+        discard - remove data from the buffer once all expected data
+                  matched, so that it is not verified again
+        """
+        self.expected_offset = 0
+        self.mismatch = False
+        self.discard_verified = discard
+
+        if expected is None:
+            self.expected = None
+            return
+
+        self.expected = bytearray(expected)
+
+        buf = self.buf
+        self.buf = bytearray()
+        self._add(buf)
+
+    def is_verified(self):
+        """Returns True if all expected data was received and matched, False
+        on mismatch and None if more data is expected"""
+        if self.mismatch:
+            return False
+
+        if self.expected is None or \
+                self.expected_offset < len(self.expected):
+            return None
+
+        return True
+
+    def append(self, data):
+        self.rx_count += len(data)
+        self._add(data)
+
+    def _add(self, data):
+        if self.expected is not None and not self.mismatch:
+            offset = self.expected_offset
+
+            if data != self.expected[offset:offset + len(data)]:
+                self.mismatch = True
+            else:
+                self.expected_offset += len(data)
+
+        self.buf += data
+
+        if len(self.buf) > self.max_len:
+            del self.buf[:len(self.buf) - self.max_len]
+
+        # buffer holds nothing but the expected data
+        if self.discard_verified and self.is_verified():
+            del self.buf[:]
+
+    def get(self):
+        return str(self.buf)
 
 
 class L2capChan:
@@ -334,27 +411,15 @@ class L2capChan:
         self.peer_bd_addr = bd_addr
         self.disconn_reason = None
         self.data_tx = []
-        self.data_rx = []
-        self.state = "init"  # "connected" / "disconnected"
+        self.data_rx = Property(L2capRxBuffer())
+        self.state = Property("init")  # "connected" / "disconnected"
 
     def _get_state(self, timeout):
-        if self.state and self.state != "init":
-            return self.state
-
         #  In case of self initiated connection, wait a while
         #  for connected/disconnected event
-        flag = Event()
-        flag.set()
-
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
+        self.state.wait_for(lambda state: state and state != "init", timeout)
 
-        while flag.is_set():
-            if self.state and self.state != "init":
-                t.cancel()
-                break
-
-        return self.state
+        return self.state.data
 
     def is_connected(self, timeout):
         state = self._get_state(timeout)
@@ -366,35 +431,41 @@ class L2capChan:
         self.psm = psm
         self.peer_bd_addr_type = bd_addr_type
         self.peer_bd_addr = bd_addr
-        self.state = "connected"
+        self.state.data = "connected"
 
     def disconnected(self, psm, bd_addr_type, bd_addr, reason):
         self.psm = None
         self.peer_bd_addr_type = None
         self.peer_bd_addr = None
         self.disconn_reason = reason
-        self.state = "disconnected"
+        self.state.data = "disconnected"
 
     def rx(self, data):
-        self.data_rx.append(data)
+        self.data_rx.data.append(data)
+        self.data_rx.notify()
 
-    def tx(self, data):
-        self.data_tx.append(data)
+    def rx_expect(self, expected, discard=False):
+        self.data_rx.data.expect(expected, discard)
 
-    def rx_data_get(self, timeout):
-        if len(self.data_rx) != 0:
-            return "".join(self.data_rx).upper()
+    def rx_verify(self, timeout):
+        """Wait for expected data, returns True if it was received
 
-        flag = Event()
-        flag.set()
+        Data received later is not verified.
+        """
+        self.data_rx.wait_for(
+            lambda rx_buf: rx_buf.is_verified() is not None, timeout)
 
-        t = Timer(timeout, timeout_cb, [flag])
-        t.start()
+        verified = bool(self.data_rx.data.is_verified())
+        self.data_rx.data.expect(None)
 
-        while flag.is_set():
-            if len(self.data_rx) != 0:
-                t.cancel()
-                return "".join(self.data_rx).upper()
+        return verified
+
+    def tx(self, data):
+        self.data_tx.append(data)
+
+    def rx_data_get(self, timeout):
+        if self.data_rx.wait_for(len, timeout):
+            return hexlify(self.data_rx.data.get()).upper()
 
         return None
 
@@ -461,13 +532,21 @@ class L2cap:
 
         chan.tx(data)
 
-    def rx_data_get_all(self, timeout):
-        data = []
+    def rx_expect(self, chan_id, expected, discard=False):
+        chan = self._chan_lookup_id(chan_id)
+        if chan is None:
+            logging.error("unknown channel")
+            return
 
-        for chan in self.channels:
-            data.append(chan.rx_data_get(timeout))
+        chan.rx_expect(expected, discard)
 
-        return data
+    def rx_verify(self, chan_id, timeout):
+        chan = self._chan_lookup_id(chan_id)
+        if chan is None:
+            logging.error("unknown channel")
+            return False
+
+        return chan.rx_verify(timeout)
 
     def tx_data_get(self, chan_id):
         chan = self._chan_lookup_id(chan_id)
@@ -17,6 +17,7 @@
 
 import shlex
 import os
+import copy
 import subprocess
 import re
 import sys
@@ -24,12 +25,17 @@ import time
 import logging
 from threading import Thread
 import Queue
+import xmlrpclib
 
 from utils import exec_iut_cmd
+from stack import Property
 import ptstypes
 
 log = logging.debug
 
+# maximum time to let IUT and PTS settle down after test case
+SETTLE_TIMEOUT = 3.0
+
 
 class MmiParser(object):
     """"Interface to parsing arguments from description of MMI
@@ -276,6 +282,39 @@ def is_cleanup_func(func):
     return isinstance(func, TestFuncCleanUp)
 
 
+def multicall(pts, method_name, args_list):
+    """Calls PTS method for each of the argument tuples in one XML-RPC request
+
+    Returns list of results in order of args_list. Fault of the first failed
+    call is raised.
+
+    """
+    if not isinstance(pts, xmlrpclib.ServerProxy):
+        # e.g. local FakeProxy, there are no requests to batch
+        method = getattr(pts, method_name)
+        return [method(*args) for args in args_list]
+
+    calls = xmlrpclib.MultiCall(pts)
+
+    for args in args_list:
+        getattr(calls, method_name)(*args)
+
+    return list(calls())
+
+
+def update_pixit_params(pts, project_name, params):
+    """Update PIXIT parameters of project in PTS with one XML-RPC request
+
+    pts -- PTS proxy
+    project_name -- PTS project name
+    params -- dictionary of PIXIT names and values
+
+    """
+    multicall(pts, "update_pixit_param",
+              [(project_name, param_name, param_value)
+               for param_name, param_value in params.items()])
+
+
 class AbstractMethodException(Exception):
     """Exception raised if an abstract method is called."""
     pass
@@ -321,15 +360,69 @@ class PTSCallback(object):
         raise AbstractMethodException()
 
 
+class TestCaseRunState(object):
+    """State of a single run of TestCase"""
+
+    __slots__ = ("status", "state", "test_ended", "settle_time",
+                 "post_wid_queue", "post_wid_thread", "thread_exception",
+                 "tc_subproc", "lf_subproc")
+
+    def __init__(self):
+        # a.k.a. final verdict
+        self.status = "init"
+        self.state = None
+        # PTS logged end of test case
+        self.test_ended = Property(False)
+        # time spent in settle
+        self.settle_time = None
+        self.post_wid_queue = []
+        self.post_wid_thread = None
+        self.thread_exception = Queue.Queue()
+        self.tc_subproc = None
+        self.lf_subproc = None
+
+
+def _run_state_property(name):
+    """TestCase attribute kept in its TestCaseRunState"""
+    return property(lambda self: getattr(self.run_state, name),
+                    lambda self, value: setattr(self.run_state, name, value))
+
+
 class TestCase(PTSCallback):
-    """A PTS test case"""
+    """A PTS test case
+
+    Test case definition, e.g. cmds and wid handlers, is shared between
+    copies, while each copy gets own TestCaseRunState when it is first used.
+
+    """
+
+    status = _run_state_property("status")
+    state = _run_state_property("state")
+    test_ended = _run_state_property("test_ended")
+    settle_time = _run_state_property("settle_time")
+    post_wid_queue = _run_state_property("post_wid_queue")
+    post_wid_thread = _run_state_property("post_wid_thread")
+    thread_exception = _run_state_property("thread_exception")
+    tc_subproc = _run_state_property("tc_subproc")
+    lf_subproc = _run_state_property("lf_subproc")
 
     def copy(self):
-        """Copy constructor"""
-        return TestCase(self.project_name, self.name, self.cmds,
-                        self.ptsproject_name, self.no_wid, self.edit1_wids,
-                        self.verify_wids, self.ok_cancel_wids,
-                        self.generic_wid_hdl)
+        """Copy constructor
+
+        Copy is of the same class and shares definition of this test case,
+        only run state is not copied.
+        """
+        test_case = copy.copy(self)
+        test_case._run_state = None
+
+        return test_case
+
+    @property
+    def run_state(self):
+        if self._run_state is None:
+            self._run_state = TestCaseRunState()
+
+        return self._run_state
 
     def __init__(self, project_name, test_case_name, cmds=[],
                  ptsproject_name=None, no_wid=None, edit1_wids=None,
@@ -369,9 +462,7 @@ class TestCase(PTSCallback):
         """
         self.project_name = project_name
         self.name = test_case_name
-        # a.k.a. final verdict
-        self.status = "init"
-        self.state = None
+        self._run_state = None
 
         if isinstance(cmds, list):
             self.cmds = list(cmds)
@@ -397,12 +488,7 @@ class TestCase(PTSCallback):
         self.verify_wids = verify_wids
         self.ok_cancel_wids = ok_cancel_wids
         self.generic_wid_hdl = generic_wid_hdl
-        self.post_wid_queue = []
-        self.post_wid_thread = None
-        self.thread_exception = Queue.Queue()
         self.ptsproject_name = ptsproject_name
-        self.tc_subproc = None
-        self.lf_subproc = None
 
     def __str__(self):
         """Returns string representation"""
@@ -437,6 +523,10 @@ class TestCase(PTSCallback):
             self.status = new_status
             log("New status %s - %s", str(self), new_status)
 
+        if log_type in (ptstypes.PTS_LOGTYPE_END_TEST,
+                        ptstypes.PTS_LOGTYPE_FINAL_VERDICT):
+            self.test_ended.data = True
+
     def handle_mmi_style_yes_no1(self, wid, description):
         """Implements implicit send handling for MMI_Style_Yes_No1"""
         log("%s, %r %r", self.handle_mmi_style_yes_no1.__name__,
@@ -724,6 +814,30 @@ class TestCase(PTSCallback):
                not is_cleanup_func(cmd):
                 cmd.start()
 
+    def wait_settled(self, timeout):
+        """Wait till PTS is done with test case
+
+        Subclasses also wait for their IUT.
+
+        Returns True if settled within timeout
+        """
+        return self.test_ended.wait_for(bool, timeout)
+
+    def settle(self):
+        """Wait till IUT and PTS settle down after test case
+
+        Waits till wait_settled, but not longer than SETTLE_TIMEOUT. Time
+        spent is kept in settle_time.
+
+        """
+        start = time.time()
+
+        if not self.wait_settled(SETTLE_TIMEOUT):
+            log("%s not settled in %s s", self, SETTLE_TIMEOUT)
+
+        self.settle_time = time.time() - start
+        log("%s settled in %.3f s", self, self.settle_time)
+
     def post_run(self, error_code):
         """Method called after test case is run in PTS
 
@@ -738,16 +852,17 @@ class TestCase(PTSCallback):
         elif error_code:
             raise Exception("Unknown error code %r!" % error_code)
 
-        # run the clean-up commands
-        for cmd in self.cmds:
-            if is_cleanup_func(cmd):
-                cmd.start()
-
         # in accordance with PTSControlClient.cpp:
         # // Allow device to settle down
         # Sleep(3000);
         # otherwise 4th test case just blocks eternally
-        time.sleep(3)
+        # Settle before clean-up, which resets the stack and stops the IUT.
+        self.settle()
+
+        # run the clean-up commands
+        for cmd in self.cmds:
+            if is_cleanup_func(cmd):
+                cmd.start()
 
         for cmd in self.cmds:
             cmd.stop()
@@ -779,14 +894,6 @@ class TestCase(PTSCallback):
 
 
 class TestCaseLT1(TestCase):
-    def copy(self):
-        """Copy constructor"""
-
-        test_case = super(TestCaseLT1, self).copy()
-        test_case.name_lt2 = self.name_lt2
-
-        return test_case
-
     def __init__(self, *args, **kwargs):
         name_lt2 = kwargs.pop('lt2', None)
         super(TestCaseLT1, self).__init__(*args, **kwargs)
@@ -797,6 +904,75 @@ class TestCaseLT2(TestCase):
     pass
 
 
+class TestCaseRegistry(object):
+    """Test case instances indexed by name
+
+    Built once per session from the list of test case instances of all
+    projects, so that looking up a test case to run does not go through
+    all of them.
+
+    Test cases of a project can also be registered with add_project, then
+    they are built only when first looked up. Sessions that run few test
+    cases, e.g. with -c, do not build the rest.
+
+    """
+
+    def __init__(self, test_cases=None):
+        """Constructor
+
+        test_cases - list of TestCase instances
+        """
+        # test case name to list of instances, one per LT role
+        self._by_name = {}
+        # project name to function returning its test cases
+        self._projects = {}
+
+        self.add(test_cases or [])
+
+    def __len__(self):
+        self._build_projects("")
+        return len(self._by_name)
+
+    def __contains__(self, name):
+        self._build_projects(name)
+        return name in self._by_name
+
+    def add(self, test_cases):
+        """Add list of TestCase instances"""
+        for test_case in test_cases:
+            self._by_name.setdefault(test_case.name, []).append(test_case)
+
+    def add_project(self, project_name, test_cases_func):
+        """Add test cases of project to be built on first lookup
+
+        project_name - PTS project name, names of its test cases start with
+                       it, e.g. GAP for GAP/BROB/BCST/BV-01-C
+        test_cases_func - function returning list of project TestCase
+                          instances
+        """
+        self._projects[project_name] = test_cases_func
+
+    def _build_projects(self, prefix):
+        """Build test cases of projects that have test case names starting
+        with prefix"""
+        for project_name in sorted(self._projects):
+            if project_name.startswith(prefix) or \
+                    prefix.startswith(project_name + "/"):
+                log("Building %s test cases", project_name)
+                self.add(self._projects.pop(project_name)())
+
+    def get(self, name, test_case_class=TestCase):
+        """Return 'test_case_class' instance if found or None otherwise"""
+        if name not in self._by_name:
+            self._build_projects(name)
+
+        for test_case in self._by_name.get(name, []):
+            if isinstance(test_case, test_case_class):
+                return test_case
+
+        return None
+
+
 def get_max_test_case_desc(test_cases):
     """Takes a list of test cases and return a tuple of longest project name
     and test case name."""
@@ -1,97 +1,206 @@
 import sqlite3
+import threading
+import time
+import uuid
 
 DATABASE_FILE = 'TestCase.db'
 
+# number of update_statistics calls written to database in one transaction
+UPDATE_BATCH_SIZE = 16
+
+# sqlite limits number of query parameters to 999
+QUERY_CHUNK_SIZE = 500
+
 
 class TestCaseTable(object):
-    def __init__(self, name):
-        self._open()
+    """Test case statistics table
+
+    Besides the running mean duration and the last result of each test case,
+    every result is appended to the <name>_history table along with the run
+    it comes from.
+
+    One connection in WAL mode is used for the lifetime of the table, so the
+    database can be read while other clients, e.g. parallel runs, write it.
+    Statistics updates are queued and written in batches, call flush to
+    write them immediately.
+
+    """
+
+    def __init__(self, name, iut_build=None):
+        """Constructor
+
+        name -- table name
+        iut_build -- IUT build identifier, e.g. commit hash, stored in history
+        """
         self.name = name
+        self.history_name = name + "_history"
+        self.run_id = uuid.uuid4().hex
+        self.iut_build = iut_build
+        self._lock = threading.Lock()
+        self._pending = []
+
+        self.conn = sqlite3.connect(DATABASE_FILE, timeout=30,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL;")
+
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS {} (name TEXT, duration REAL, "
+                "count INTEGER, result TEXT);".format(self.name))
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS {0}_name ON {0} (name);".format(
+                    self.name))
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS {} (run_id TEXT, timestamp REAL, "
+                "iut_build TEXT, name TEXT, duration REAL, result TEXT, "
+                "retries INTEGER);".format(self.history_name))
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS {0}_name ON {0} (name);".format(
+                    self.history_name))
+
+    def close(self):
+        self.flush()
+
+        with self._lock:
+            self.conn.close()
+
+    def flush(self):
+        """Write queued statistics updates"""
+        with self._lock:
+            pending, self._pending = self._pending, []
 
-        self.cursor.execute(
-            "CREATE TABLE IF NOT EXISTS {} (name TEXT, duration REAL, "
-            "count INTEGER, result TEXT);".format(self.name))
-        self.conn.commit()
-
-        self._close()
-
-    def _open(self):
-        self.conn = sqlite3.connect(DATABASE_FILE)
-        self.cursor = self.conn.cursor()
-
-    def _close(self):
-        self.cursor.close()
-        self.conn.close()
-
-    def update_statistics(self, test_case_name, duration, result):
-        self._open()
-
-        self.cursor.execute(
-            "SELECT duration, count FROM {} "
-            "WHERE name=:name;".format(self.name), {"name": test_case_name})
-        row = self.cursor.fetchall()
-        if len(row) == 0:
-            self.cursor.execute(
-                "INSERT INTO {} VALUES(?, ?, ?, ?);".format(self.name),
-                (test_case_name, duration, 1, result))
-            self.conn.commit()
-            return
-
-        (mean, count) = row[0]
-        if not count:
-            count = 0
-            mean = 0
-
-        count += 1
-        mean += (duration - mean) / count
-
-        self.cursor.execute(
-            "UPDATE {} SET duration=:duration, count=:count, result=:result "
-            "WHERE name=:name".format(self.name), {"duration": mean,
-                                                   "count": count,
-                                                   "name": test_case_name,
-                                                   "result": result})
-        self.conn.commit()
-        self._close()
+            if not pending:
+                return
+
+            # update running mean, insert if test case is not there yet
+            with self.conn:
+                for test_case_name, duration, result, retries, timestamp \
+                        in pending:
+                    params = {"name": test_case_name, "duration": duration,
+                              "result": result}
+
+                    cursor = self.conn.execute(
+                        "UPDATE {} SET "
+                        "duration=CASE WHEN count > 0 "
+                        "THEN duration + (:duration - duration) / (count + 1) "
+                        "ELSE :duration END, "
+                        "count=IFNULL(count, 0) + 1, result=:result "
+                        "WHERE name=:name;".format(self.name), params)
+
+                    if cursor.rowcount == 0:
+                        self.conn.execute(
+                            "INSERT INTO {} VALUES(:name, :duration, 1, "
+                            ":result);".format(self.name), params)
+
+                self.conn.executemany(
+                    "INSERT INTO {} VALUES(?, ?, ?, ?, ?, ?, ?);".format(
+                        self.history_name),
+                    [(self.run_id, timestamp, self.iut_build, test_case_name,
+                      duration, result, retries)
+                     for test_case_name, duration, result, retries, timestamp
+                     in pending])
+
+    def update_statistics(self, test_case_name, duration, result, retries=0):
+        """Queue result of test case
+
+        retries -- number of times test case was retried in this run
+        """
+        with self._lock:
+            self._pending.append((test_case_name, float(duration), result,
+                                  retries, time.time()))
+            batch_full = len(self._pending) >= UPDATE_BATCH_SIZE
+
+        if batch_full:
+            self.flush()
 
     def get_mean_duration(self, test_case_name):
-        self._open()
+        self.flush()
+
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT duration FROM {} "
+                "WHERE name=:name;".format(self.name),
+                {"name": test_case_name}).fetchone()
 
-        self.cursor.execute(
-            "SELECT duration FROM {} "
-            "WHERE name=:name;".format(self.name), {"name": test_case_name})
-        row = self.cursor.fetchone()
         if row is not None:
             return row[0]
 
-        self._close()
-
     def get_result(self, test_case_name):
-        self._open()
+        with self._lock:
+            for pending in reversed(self._pending):
+                name, result = pending[0], pending[2]
+                if name == test_case_name:
+                    return result
+
+            row = self.conn.execute(
+                "SELECT result FROM {} "
+                "WHERE name=:name".format(self.name),
+                {"name": test_case_name}).fetchone()
 
-        self.cursor.execute(
-            "SELECT result FROM {} "
-            "WHERE name=:name".format(self.name), {"name": test_case_name})
-        row = self.cursor.fetchone()
         if row is not None:
             return row[0]
 
-        self._close()
+    def _get_rows(self, test_cases_names):
+        """Returns dict of test case name to (duration, result)"""
+        rows = {}
+
+        with self._lock:
+            for i in range(0, len(test_cases_names), QUERY_CHUNK_SIZE):
+                chunk = test_cases_names[i:i + QUERY_CHUNK_SIZE]
+
+                cursor = self.conn.execute(
+                    "SELECT name, duration, result FROM {} "
+                    "WHERE name IN ({});".format(
+                        self.name, ", ".join("?" * len(chunk))), chunk)
+
+                for name, duration, result in cursor:
+                    rows[name] = (duration, result)
+
+        return rows
+
+    def get_mean_durations(self, test_cases_names):
+        """Returns dict of test case name to mean duration of test cases
+        that were run before"""
+        self.flush()
+
+        return {name: duration for name, (duration, _) in
+                self._get_rows(list(test_cases_names)).items()
+                if duration is not None}
+
+    def get_baseline_durations(self, test_cases_names):
+        """Returns dict of test case name to mean duration in runs of other
+        IUT builds
+
+        Unlike get_mean_durations, these do not change while this IUT build is
+        tested, e.g. by clients running other shards of the same list.
+        """
+        names = set(test_cases_names)
+
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT name, AVG(duration) FROM {} WHERE iut_build IS NOT ? "
+                "GROUP BY name;".format(self.history_name), (self.iut_build,))
+
+            return {name: duration for name, duration in cursor
+                    if name in names}
 
     def estimate_session_duration(self, test_cases_names, run_count_max):
         duration = 0
         count_unknown = 0
         num_test_cases = len(test_cases_names)
 
+        self.flush()
+        rows = self._get_rows(list(test_cases_names))
+
         for test_case_name in test_cases_names:
             expected_run_count = 1
 
+            mean_time, last_result = rows.get(test_case_name, (None, None))
+
             # Assume worst case scenario
-            last_result = self.get_result(test_case_name)
             if last_result and last_result != 'PASS':
                 expected_run_count = run_count_max
 
-            mean_time = self.get_mean_duration(test_case_name)
             if mean_time is None:
                 count_unknown += 1
             else:
@@ -102,3 +211,64 @@ class TestCaseTable(object):
 
         return duration
 
+    def _get_history(self, test_case_name, column, last_n=None):
+        """Returns rows of history columns, most recent first"""
+        self.flush()
+
+        # rows written at the same time are ordered as they were written
+        query = ("SELECT {} FROM {} WHERE name=? "
+                 "ORDER BY timestamp DESC, rowid DESC".format(
+                     column, self.history_name))
+        params = [test_case_name]
+
+        if last_n:
+            query += " LIMIT ?"
+            params.append(last_n)
+
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def get_duration_percentile(self, test_case_name, percentile,
+                                last_n=None):
+        """Returns duration percentile of test case, None if never run
+
+        percentile -- 0 to 100, e.g. 50 for median
+        last_n -- use only last_n runs, all runs if not specified
+        """
+        durations = sorted(row[0] for row in self._get_history(
+            test_case_name, "duration", last_n))
+        if not durations:
+            return None
+
+        # nearest-rank method
+        rank = max(int(-(-percentile * len(durations) // 100)), 1)
+
+        return durations[rank - 1]
+
+    def get_flake_rate(self, test_case_name, last_n=None):
+        """Returns fraction of runs in which test case passed only after
+        being retried, None if never run"""
+        runs = self._get_history(test_case_name, "result, retries", last_n)
+        if not runs:
+            return None
+
+        flaky = sum(1 for result, retries in runs
+                    if result == 'PASS' and retries)
+
+        return float(flaky) / len(runs)
+
+    def get_last_results(self, test_case_name, last_n=10):
+        """Returns last_n results of test case, most recent first"""
+        return [row[0] for row in
+                self._get_history(test_case_name, "result", last_n)]
+
+    def get_most_expensive(self, limit=10):
+        """Returns list of (test case name, total duration) of test cases that
+        took most of the time across all runs"""
+        self.flush()
+
+        with self._lock:
+            return self.conn.execute(
+                "SELECT name, SUM(duration) AS total FROM {} GROUP BY name "
+                "ORDER BY total DESC LIMIT ?".format(self.history_name),
+                (limit,)).fetchall()
@@ -17,7 +17,7 @@
 
 try:
     from ptsprojects.testcase import TestCase, TestCmd, TestFunc, \
-        TestFuncCleanUp
+        TestFuncCleanUp, update_pixit_params
     from ptsprojects.zephyr.ztestcase import ZTestCase
 
 except ImportError:  # running this module as script
@@ -25,7 +25,7 @@ except ImportError:  # running this module as script
     sys.path.append("../..")  # to be able to locate the following imports
 
     from ptsprojects.testcase import TestCase, TestCmd, TestFunc, \
-        TestFuncCleanUp
+        TestFuncCleanUp, update_pixit_params
     from ptsprojects.zephyr.ztestcase import ZTestCase
 
 from time import sleep
@@ -114,67 +114,68 @@ def set_pixits(pts):
         ad_str_name_short
 
     # Set GAP common PIXIT values
-    pts.set_pixit("GAP", "TSPX_bd_addr_iut", "DEADBEEFDEAD")
-    pts.set_pixit("GAP", "TSPX_bd_addr_PTS", "C000DEADBEEF")
-    pts.set_pixit("GAP", "TSPX_broadcaster_class_of_device", "100104")
-    pts.set_pixit("GAP", "TSPX_observer_class_of_device", "100104")
-    pts.set_pixit("GAP", "TSPX_peripheral_class_of_device", "100104")
-    pts.set_pixit("GAP", "TSPX_central_class_of_device", "100104")
-    pts.set_pixit("GAP", "TSPX_security_enabled", "FALSE")
-    pts.set_pixit("GAP", "TSPX_delete_link_key", "FALSE")
-    pts.set_pixit("GAP", "TSPX_iut_setup_att_over_br_edr", "FALSE")
-    pts.set_pixit("GAP", "TSPX_mtu_size", "23")
-    pts.set_pixit("GAP", "TSPX_delete_ltk", "FALSE")
-    pts.set_pixit("GAP", "TSPX_pin_code", "0000")
-    pts.set_pixit("GAP", "TSPX_time_guard", "300000")
-    pts.set_pixit("GAP", "TSPX_use_implicit_send", "TRUE")
-    pts.set_pixit("GAP", "TSPX_secure_simple_pairing_pass_key_confirmation",
-                  "FALSE")
-    pts.set_pixit("GAP", "TSPX_using_public_device_address", "TRUE")
-    pts.set_pixit("GAP", "TSPX_using_random_device_address", "FALSE")
-    pts.set_pixit("GAP", "TSPX_lim_adv_timeout", "30720")
-    pts.set_pixit("GAP", "TSPX_gen_disc_adv_min", "30720")
-    pts.set_pixit("GAP", "TSPX_lim_disc_scan_min", "10240")
-    pts.set_pixit("GAP", "TSPX_gen_disc_scan_min", "10240")
-    pts.set_pixit("GAP", "TSPX_database_file", "Database-GAP.sig")
-    pts.set_pixit("GAP", "TSPX_iut_rx_mtu", "23")
-    pts.set_pixit("GAP", "TSPX_iut_private_address_interval", "60000")
-    pts.set_pixit("GAP", "TSPX_iut_privacy_enabled", "FALSE")
-    pts.set_pixit("GAP", "TSPX_psm", "1001")
-    pts.set_pixit("GAP", "TSPX_iut_valid_connection_interval_min", "00C8")
-    pts.set_pixit("GAP", "TSPX_iut_valid_connection_interval_max", "03C0")
-    pts.set_pixit("GAP", "TSPX_iut_valid_connection_latency", "0006")
-    pts.set_pixit("GAP", "TSPX_iut_valid_timeout_multiplier", "0962")
-    pts.set_pixit("GAP", "TSPX_iut_connection_parameter_timeout", "30000")
-    pts.set_pixit("GAP", "TSPX_iut_invalid_connection_interval_min", "0000")
-    pts.set_pixit("GAP", "TSPX_iut_invalid_connection_interval_max", "0000")
-    pts.set_pixit("GAP", "TSPX_iut_invalid_connection_latency", "0000")
-    pts.set_pixit("GAP", "TSPX_iut_invalid_conn_update_supervision_timeout", "0800")
-    pts.set_pixit("GAP", "TSPX_LE_scan_interval", "0010")
-    pts.set_pixit("GAP", "TSPX_LE_scan_window", "0010")
-    pts.set_pixit("GAP", "TSPX_con_interval_min", "0032")
-    pts.set_pixit("GAP", "TSPX_con_interval_max", "0046")
-    pts.set_pixit("GAP", "TSPX_con_latency", "0001")
-    pts.set_pixit("GAP", "TSPX_supervision_timeout", "07D0")
-    pts.set_pixit("GAP", "TSPX_minimum_ce_length", "0000")
-    pts.set_pixit("GAP", "TSPX_maximum_ce_length", "0000")
-    pts.set_pixit("GAP", "TSPX_conn_update_int_min", "0032")
-    pts.set_pixit("GAP", "TSPX_conn_update_int_max", "0046")
-    pts.set_pixit("GAP", "TSPX_conn_update_slave_latency", "0001")
-    pts.set_pixit("GAP", "TSPX_conn_update_supervision_timeout", "01F4")
-    pts.set_pixit("GAP", "TSPX_pairing_before_service_request", "FALSE")
-    pts.set_pixit("GAP", "TSPX_iut_mandates_mitm", "FALSE")
-    pts.set_pixit("GAP", "TSPX_encryption_before_service_request", "FALSE")
-    pts.set_pixit("GAP", "TSPX_tester_appearance", "0000")
-    pts.set_pixit("GAP", "TSPX_advertising_data", ad_pixit)
-    pts.set_pixit("GAP", "TSPX_iut_device_IRK_for_resolvable_privacy_address_generation_procedure",
-                  "00000000000000000000000000000000")
-    pts.set_pixit("GAP", "TSPX_tester_device_IRK_for_resolvable_privacy_address_generation_procedure",
-                  "0123456789ABCDEF0123456789ABCDEF")
-    pts.set_pixit("GAP",
-                  "TSPX_iut_device_name_in_adv_packet_for_random_address", iut_device_name)
-    pts.set_pixit("GAP", "TSPX_Tgap_104", "60000")
-    pts.set_pixit("GAP", "TSPX_URI", "162F2F7777772E626C7565746F6F74682E636F6D")
+    pts.set_pixits_bulk("GAP", {
+        "TSPX_bd_addr_iut": "DEADBEEFDEAD",
+        "TSPX_bd_addr_PTS": "C000DEADBEEF",
+        "TSPX_broadcaster_class_of_device": "100104",
+        "TSPX_observer_class_of_device": "100104",
+        "TSPX_peripheral_class_of_device": "100104",
+        "TSPX_central_class_of_device": "100104",
+        "TSPX_security_enabled": "FALSE",
+        "TSPX_delete_link_key": "FALSE",
+        "TSPX_iut_setup_att_over_br_edr": "FALSE",
+        "TSPX_mtu_size": "23",
+        "TSPX_delete_ltk": "FALSE",
+        "TSPX_pin_code": "0000",
+        "TSPX_time_guard": "300000",
+        "TSPX_use_implicit_send": "TRUE",
+        "TSPX_secure_simple_pairing_pass_key_confirmation": "FALSE",
+        "TSPX_using_public_device_address": "TRUE",
+        "TSPX_using_random_device_address": "FALSE",
+        "TSPX_lim_adv_timeout": "30720",
+        "TSPX_gen_disc_adv_min": "30720",
+        "TSPX_lim_disc_scan_min": "10240",
+        "TSPX_gen_disc_scan_min": "10240",
+        "TSPX_database_file": "Database-GAP.sig",
+        "TSPX_iut_rx_mtu": "23",
+        "TSPX_iut_private_address_interval": "60000",
+        "TSPX_iut_privacy_enabled": "FALSE",
+        "TSPX_psm": "1001",
+        "TSPX_iut_valid_connection_interval_min": "00C8",
+        "TSPX_iut_valid_connection_interval_max": "03C0",
+        "TSPX_iut_valid_connection_latency": "0006",
+        "TSPX_iut_valid_timeout_multiplier": "0962",
+        "TSPX_iut_connection_parameter_timeout": "30000",
+        "TSPX_iut_invalid_connection_interval_min": "0000",
+        "TSPX_iut_invalid_connection_interval_max": "0000",
+        "TSPX_iut_invalid_connection_latency": "0000",
+        "TSPX_iut_invalid_conn_update_supervision_timeout": "0800",
+        "TSPX_LE_scan_interval": "0010",
+        "TSPX_LE_scan_window": "0010",
+        "TSPX_con_interval_min": "0032",
+        "TSPX_con_interval_max": "0046",
+        "TSPX_con_latency": "0001",
+        "TSPX_supervision_timeout": "07D0",
+        "TSPX_minimum_ce_length": "0000",
+        "TSPX_maximum_ce_length": "0000",
+        "TSPX_conn_update_int_min": "0032",
+        "TSPX_conn_update_int_max": "0046",
+        "TSPX_conn_update_slave_latency": "0001",
+        "TSPX_conn_update_supervision_timeout": "01F4",
+        "TSPX_pairing_before_service_request": "FALSE",
+        "TSPX_iut_mandates_mitm": "FALSE",
+        "TSPX_encryption_before_service_request": "FALSE",
+        "TSPX_tester_appearance": "0000",
+        "TSPX_advertising_data": ad_pixit,
+        "TSPX_iut_device_IRK_for_resolvable_privacy_address_generation_procedure":
+            "00000000000000000000000000000000",
+        "TSPX_tester_device_IRK_for_resolvable_privacy_address_generation_procedure":
+            "0123456789ABCDEF0123456789ABCDEF",
+        "TSPX_iut_device_name_in_adv_packet_for_random_address":
+            iut_device_name,
+        "TSPX_Tgap_104": "60000",
+        "TSPX_URI": "162F2F7777772E626C7565746F6F74682E636F6D",
+    })
 
 
 def test_cases(pts):
@@ -191,18 +192,15 @@ def test_cases(pts):
                  iut_manufacturer_data, iut_appearance, iut_svc_data, iut_flags,
                  iut_svcs),
         TestFunc(btp.gap_read_ctrl_info),
-        TestFunc(lambda: pts.update_pixit_param(
-            "GAP", "TSPX_bd_addr_iut",
-            stack.gap.iut_addr_get_str())),
-        TestFunc(lambda: pts.update_pixit_param(
-            "GAP", "TSPX_iut_privacy_enabled",
-            "TRUE" if stack.gap.iut_has_privacy() else "FALSE")),
-        TestFunc(lambda: pts.update_pixit_param(
-            "GAP", "TSPX_using_public_device_address",
-            "FALSE" if stack.gap.iut_addr_is_random() else "TRUE")),
-        TestFunc(lambda: pts.update_pixit_param(
-            "GAP", "TSPX_using_random_device_address",
-            "TRUE" if stack.gap.iut_addr_is_random() else "FALSE")),
+        TestFunc(lambda: update_pixit_params(pts, "GAP", {
+            "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+            "TSPX_iut_privacy_enabled":
+                "TRUE" if stack.gap.iut_has_privacy() else "FALSE",
+            "TSPX_using_public_device_address":
+                "FALSE" if stack.gap.iut_addr_is_random() else "TRUE",
+            "TSPX_using_random_device_address":
+                "TRUE" if stack.gap.iut_addr_is_random() else "FALSE",
+        })),
 
         # We do this on test case, because previous one could update
         # this if RPA was used by PTS
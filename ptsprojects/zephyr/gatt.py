@@ -121,53 +121,58 @@ def set_pixits(ptses):
     pts = ptses[0]
     pts2 = ptses[1]
 
-    pts.set_pixit("GATT", "TSPX_bd_addr_iut", "DEADBEEFDEAD")
-    pts.set_pixit("GATT", "TSPX_iut_device_name_in_adv_packet_for_random_address", "")
-    pts.set_pixit("GATT", "TSPX_security_enabled", "FALSE")
-    pts.set_pixit("GATT", "TSPX_delete_link_key", "TRUE")
-    pts.set_pixit("GATT", "TSPX_time_guard", "180000")
-    pts.set_pixit("GATT", "TSPX_selected_handle", "0012")
-    pts.set_pixit("GATT", "TSPX_use_implicit_send", "TRUE")
-    pts.set_pixit("GATT", "TSPX_secure_simple_pairing_pass_key_confirmation", "FALSE")
-    pts.set_pixit("GATT", "TSPX_iut_use_dynamic_bd_addr", "FALSE")
-    pts.set_pixit("GATT", "TSPX_iut_setup_att_over_br_edr", "FALSE")
-    pts.set_pixit("GATT", "TSPX_tester_database_file",
-                  "C:\Program Files\Bluetooth SIG\Bluetooth PTS\Data\SIGDatabase\GATT_Qualification_Test_Databases.xml")
-    pts.set_pixit("GATT", "TSPX_iut_is_client_periphral", "FALSE")
-    pts.set_pixit("GATT", "TSPX_iut_is_server_central", "FALSE")
-    pts.set_pixit("GATT", "TSPX_mtu_size", "23")
-    pts.set_pixit("GATT", "TSPX_pin_code", "0000")
-    pts.set_pixit("GATT", "TSPX_use_dynamic_pin", "FALSE")
-    pts.set_pixit("GATT", "TSPX_delete_ltk", "TRUE")
-    pts.set_pixit("GATT", "TSPX_tester_appearance", "0000")
-
-
-    pts2.set_pixit("GATT", "TSPX_bd_addr_iut", "DEADBEEFDEAD")
-    pts2.set_pixit("GATT", "TSPX_iut_device_name_in_adv_packet_for_random_address", "")
-    pts2.set_pixit("GATT", "TSPX_security_enabled", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_delete_link_key", "TRUE")
-    pts2.set_pixit("GATT", "TSPX_time_guard", "180000")
-    pts2.set_pixit("GATT", "TSPX_selected_handle", "0012")
-    pts2.set_pixit("GATT", "TSPX_use_implicit_send", "TRUE")
-    pts2.set_pixit("GATT", "TSPX_secure_simple_pairing_pass_key_confirmation", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_iut_use_dynamic_bd_addr", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_iut_setup_att_over_br_edr", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_tester_database_file",
-                  "C:\Program Files\Bluetooth SIG\Bluetooth PTS\Data\SIGDatabase\GATT_Qualification_Test_Databases.xml")
-    pts2.set_pixit("GATT", "TSPX_iut_is_client_periphral", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_iut_is_server_central", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_mtu_size", "23")
-    pts2.set_pixit("GATT", "TSPX_pin_code", "0000")
-    pts2.set_pixit("GATT", "TSPX_use_dynamic_pin", "FALSE")
-    pts2.set_pixit("GATT", "TSPX_delete_ltk", "TRUE")
-    pts2.set_pixit("GATT", "TSPX_tester_appearance", "0000")
+    pts.set_pixits_bulk("GATT", {
+        "TSPX_bd_addr_iut": "DEADBEEFDEAD",
+        "TSPX_iut_device_name_in_adv_packet_for_random_address": "",
+        "TSPX_security_enabled": "FALSE",
+        "TSPX_delete_link_key": "TRUE",
+        "TSPX_time_guard": "180000",
+        "TSPX_selected_handle": "0012",
+        "TSPX_use_implicit_send": "TRUE",
+        "TSPX_secure_simple_pairing_pass_key_confirmation": "FALSE",
+        "TSPX_iut_use_dynamic_bd_addr": "FALSE",
+        "TSPX_iut_setup_att_over_br_edr": "FALSE",
+        "TSPX_tester_database_file":
+            "C:\Program Files\Bluetooth SIG\Bluetooth PTS\Data\SIGDatabase\GATT_Qualification_Test_Databases.xml",
+        "TSPX_iut_is_client_periphral": "FALSE",
+        "TSPX_iut_is_server_central": "FALSE",
+        "TSPX_mtu_size": "23",
+        "TSPX_pin_code": "0000",
+        "TSPX_use_dynamic_pin": "FALSE",
+        "TSPX_delete_ltk": "TRUE",
+        "TSPX_tester_appearance": "0000",
+    })
+
+
+    pts2.set_pixits_bulk("GATT", {
+        "TSPX_bd_addr_iut": "DEADBEEFDEAD",
+        "TSPX_iut_device_name_in_adv_packet_for_random_address": "",
+        "TSPX_security_enabled": "FALSE",
+        "TSPX_delete_link_key": "TRUE",
+        "TSPX_time_guard": "180000",
+        "TSPX_selected_handle": "0012",
+        "TSPX_use_implicit_send": "TRUE",
+        "TSPX_secure_simple_pairing_pass_key_confirmation": "FALSE",
+        "TSPX_iut_use_dynamic_bd_addr": "FALSE",
+        "TSPX_iut_setup_att_over_br_edr": "FALSE",
+        "TSPX_tester_database_file":
+            "C:\Program Files\Bluetooth SIG\Bluetooth PTS\Data\SIGDatabase\GATT_Qualification_Test_Databases.xml",
+        "TSPX_iut_is_client_periphral": "FALSE",
+        "TSPX_iut_is_server_central": "FALSE",
+        "TSPX_mtu_size": "23",
+        "TSPX_pin_code": "0000",
+        "TSPX_use_dynamic_pin": "FALSE",
+        "TSPX_delete_ltk": "TRUE",
+        "TSPX_tester_appearance": "0000",
+    })
 
 
 def test_cases_server(ptses):
-    """Returns a list of GATT Server test cases"""
+    """Returns a list of GATT Server test cases, empty if there is no second
+    PTS for LT2"""
 
     if len(ptses) < 2:
-        return
+        return []
 
     pts = ptses[0]
     pts2 = ptses[1]
@@ -177,13 +182,12 @@ def test_cases_server(ptses):
 
     pre_conditions = [TestFunc(btp.core_reg_svc_gap),
                       TestFunc(btp.gap_read_ctrl_info),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "GATT", "TSPX_bd_addr_iut",
-                          stack.gap.iut_addr_get_str())),
-                      TestFunc(lambda: pts.update_pixit_param(
-                          "GATT", "TSPX_iut_use_dynamic_bd_addr",
-                          "TRUE" if stack.gap.iut_addr_is_random()
-                          else "FALSE")),
+                      TestFunc(lambda: update_pixit_params(pts, "GATT", {
+                          "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+                          "TSPX_iut_use_dynamic_bd_addr":
+                              "TRUE" if stack.gap.iut_addr_is_random()
+                              else "FALSE",
+                      })),
                       TestFunc(btp.core_reg_svc_gatt),
                       TestFunc(btp.gap_set_conn),
                       TestFunc(btp.gap_set_gendiscov)]
@@ -191,22 +195,20 @@ def test_cases_server(ptses):
     pre_conditions_1 = [TestFunc(btp.core_reg_svc_gap),
                         TestFunc(btp.core_reg_svc_gatt),
                         TestFunc(btp.gap_read_ctrl_info),
-                        TestFunc(lambda: pts.update_pixit_param(
-                            "GATT", "TSPX_bd_addr_iut",
-                            stack.gap.iut_addr_get_str())),
-                        TestFunc(lambda: pts.update_pixit_param(
-                            "GATT", "TSPX_iut_use_dynamic_bd_addr",
-                            "TRUE" if stack.gap.iut_addr_is_random()
-                            else "FALSE")),
+                        TestFunc(lambda: update_pixit_params(pts, "GATT", {
+                            "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+                            "TSPX_iut_use_dynamic_bd_addr":
+                                "TRUE" if stack.gap.iut_addr_is_random()
+                                else "FALSE",
+                        })),
                         TestFunc(stack.gatt_init)]
 
-    pre_conditions_lt2 = [TestFunc(lambda: pts2.update_pixit_param(
-                                   "GATT", "TSPX_bd_addr_iut",
-                                   stack.gap.iut_addr_get_str())),
-                          TestFunc(lambda: pts2.update_pixit_param(
-                                   "GATT", "TSPX_iut_use_dynamic_bd_addr",
-                                   "TRUE" if stack.gap.iut_addr_is_random()
-                                   else "FALSE"))]
+    pre_conditions_lt2 = [
+        TestFunc(lambda: update_pixit_params(pts2, "GATT", {
+            "TSPX_bd_addr_iut": stack.gap.iut_addr_get_str(),
+            "TSPX_iut_use_dynamic_bd_addr":
+                "TRUE" if stack.gap.iut_addr_is_random() else "FALSE",
+        }))]
 
     init_server_1 = [TestFunc(btp.gatts_add_svc, 0, UUID.VND16_1),
                      TestFunc(btp.gatts_add_char, 0,
@@ -17,10 +17,14 @@ import subprocess
 import os
 import logging
 import shlex
+import socket
+import threading
+import time
+import Queue
 
 from pybtp import defs
 from pybtp.types import BTPError
-from pybtp.iutctl_common import BTPWorker
+from pybtp.iutctl_common import BTPMuxWorker, WaitQueue, check_rsp_hdr
 
 log = logging.debug
 ZEPHYR = None
@@ -31,36 +35,226 @@ QEMU_BIN = "qemu-system-arm"
 # BTP communication transport: unix domain socket file name
 BTP_ADDRESS = "/tmp/bt-stack-tester"
 
+# QEMU Bluetooth controller: unix domain socket file name of btproxy
+BT_SERVER_ADDRESS = "/tmp/bt-server-bredr"
+
 # qemu log file object
 IUT_LOG_FO = None
 
+# timeout of BTP commands used to reset warm IUT
+WARM_RESET_TIMEOUT = 5.0
+
+# time to wait for a pre-booted IUT before booting one in place
+QEMU_POOL_TIMEOUT = 30.0
+
 
-def get_qemu_cmd(kernel_image):
+def get_qemu_cmd(kernel_image, btp_address=BTP_ADDRESS,
+                 bt_server_address=BT_SERVER_ADDRESS):
     """Returns qemu command to start Zephyr
 
-    kernel_image -- Path to Zephyr kernel image"""
+    kernel_image -- Path to Zephyr kernel image
+    btp_address -- BTP unix domain socket file name
+    bt_server_address -- btproxy unix domain socket file name"""
 
     qemu_cmd = ("%s -cpu cortex-m3 -machine lm3s6965evb -nographic "
                 "-serial mon:stdio "
                 "-serial unix:%s "
-                "-serial unix:/tmp/bt-server-bredr "
+                "-serial unix:%s "
                 "-kernel %s" %
-                (QEMU_BIN, BTP_ADDRESS, kernel_image))
+                (QEMU_BIN, btp_address, bt_server_address, kernel_image))
 
     return qemu_cmd
 
 
+class QemuIUT(object):
+    """QEMU Zephyr instance with its own BTP socket"""
+
+    def __init__(self, kernel_image, btp_address,
+                 bt_server_address=BT_SERVER_ADDRESS):
+        self.kernel_image = kernel_image
+        self.btp_address = btp_address
+        self.bt_server_address = bt_server_address
+        self.btp_socket = None
+        self.qemu_process = None
+        # index of controller, when instance is booted by QemuPool
+        self.pool_index = None
+
+    def boot(self):
+        """Start QEMU and wait for IUT ready event"""
+        log("%s.%s %s", self.__class__.__name__, self.boot.__name__,
+            self.btp_address)
+
+        self.btp_socket = BTPMuxWorker(self.btp_address)
+        self.btp_socket.open()
+
+        qemu_cmd = get_qemu_cmd(self.kernel_image, self.btp_address,
+                                self.bt_server_address)
+
+        log("Starting QEMU zephyr process: %s", qemu_cmd)
+
+        self.qemu_process = subprocess.Popen(shlex.split(qemu_cmd),
+                                             shell=False,
+                                             stdout=IUT_LOG_FO,
+                                             stderr=IUT_LOG_FO)
+
+        self.btp_socket.accept()
+
+        tuple_hdr, _ = self.btp_socket.read()
+
+        if (tuple_hdr.svc_id, tuple_hdr.op) != (defs.BTP_SERVICE_ID_CORE,
+                                                defs.CORE_EV_IUT_READY):
+            raise BTPError("Failed to get ready event")
+
+    def stop(self):
+        """Power off the instance"""
+        if self.btp_socket:
+            self.btp_socket.close()
+            self.btp_socket = None
+
+        if self.qemu_process and self.qemu_process.poll() is None:
+            self.qemu_process.terminate()
+            self.qemu_process.wait()
+            self.qemu_process = None
+
+        if os.path.exists(self.btp_address):
+            os.remove(self.btp_address)
+
+
+class QemuPool(object):
+    """Keeps QEMU instances booted in the background
+
+    HCI user channel of a controller can be used by one QEMU only, so each
+    instance gets a controller of its own, btproxy socket
+    <bt_server_address>-<n>, and a BTP socket <btp_address>-<n>. Instances
+    are booted on controllers that are free, so while the current test case
+    runs, the other controllers have the next IUTs booting.
+
+    """
+
+    def __init__(self, kernel_image, size=1, btp_address=BTP_ADDRESS,
+                 bt_server_address=BT_SERVER_ADDRESS):
+        """Constructor
+
+        kernel_image -- Path to Zephyr kernel image
+        size -- Number of controllers, i.e. instances alive at a time
+                including the one in use
+        btp_address -- Prefix of instances BTP socket file names
+        bt_server_address -- Prefix of btproxy socket file names
+        """
+        log("%s.%s kernel_image=%s size=%d", self.__class__.__name__,
+            self.__init__.__name__, kernel_image, size)
+
+        self.kernel_image = kernel_image
+        self.btp_address = btp_address
+        self.bt_server_address = bt_server_address
+        self._booted = WaitQueue()
+        # indexes of controllers that have no instance
+        self._free_controllers = Queue.Queue()
+        self._running = True
+
+        for index in range(1, size + 1):
+            self._free_controllers.put(index)
+
+        self._boot_thread = threading.Thread(target=self._boot_task,
+                                             name="QemuPool")
+        self._boot_thread.daemon = True
+        self._boot_thread.start()
+
+    def _boot_task(self):
+        while True:
+            index = self._free_controllers.get()
+
+            if not self._running:
+                break
+
+            iut = QemuIUT(self.kernel_image,
+                          "%s-%d" % (self.btp_address, index),
+                          "%s-%d" % (self.bt_server_address, index))
+            iut.pool_index = index
+
+            try:
+                iut.boot()
+            except Exception:
+                logging.exception("Failed to boot IUT %s", iut.btp_address)
+                self.release(iut)
+                time.sleep(1)
+                continue
+
+            if not self._running:
+                iut.stop()
+                break
+
+            self._booted.put(iut)
+
+    def get(self, timeout=QEMU_POOL_TIMEOUT):
+        """Returns booted QemuIUT
+
+        Returned instance has to be given back with release. Raises BTPError
+        if no instance got booted in timeout seconds.
+        """
+        try:
+            return self._booted.get(timeout)
+        except Queue.Empty:
+            raise BTPError("No IUT booted in QEMU pool in %s s" % timeout)
+
+    def release(self, iut):
+        """Power off instance and boot a new one on its controller"""
+        log("%s.%s %s", self.__class__.__name__, self.release.__name__,
+            iut.btp_address)
+
+        iut.stop()
+        self._free_controllers.put(iut.pool_index)
+
+    def close(self):
+        """Stop booting and power off pooled instances"""
+        log("%s.%s", self.__class__.__name__, self.close.__name__)
+
+        self._running = False
+        # wake up boot thread waiting for a free controller
+        self._free_controllers.put(None)
+        self._boot_thread.join()
+
+        while True:
+            try:
+                self._booted.get_nowait().stop()
+            except Queue.Empty:
+                break
+
+
 class ZephyrCtl:
     '''Zephyr OS Control Class'''
 
-    def __init__(self, kernel_image, tty_file, board_name=None):
-        """Constructor."""
-        log("%s.%s kernel_image=%s tty_file=%s board_name=%s",
-            self.__class__, self.__init__.__name__, kernel_image, tty_file,
-            board_name)
+    def __init__(self, kernel_image, tty_file, board_name=None, warm=False,
+                 qemu_pool=0, btp_address=BTP_ADDRESS,
+                 bt_server_address=BT_SERVER_ADDRESS):
+        """Constructor.
+
+        warm -- keep IUT running between test cases and reset it with BTP
+                commands instead of restarting QEMU or resetting HW
+        qemu_pool -- number of controllers to boot QEMU instances on in
+                     advance, see QemuPool. 0 to boot QEMU when test case
+                     starts. Not used with tty_file.
+        btp_address -- BTP unix domain socket file name
+        bt_server_address -- btproxy socket file name used by QEMU
+        """
+        log("%s.%s kernel_image=%s tty_file=%s board_name=%s warm=%s "
+            "qemu_pool=%s", self.__class__, self.__init__.__name__,
+            kernel_image, tty_file, board_name, warm, qemu_pool)
 
         self.kernel_image = kernel_image
         self.tty_file = tty_file
+        self.btp_address = btp_address
+        self.bt_server_address = bt_server_address
+        self.warm = warm
+        # True if IUT ready event was already received or, for warm reset
+        # IUT, there is no ready event to wait for
+        self.iut_ready = False
+
+        if qemu_pool and not tty_file:
+            self.qemu_pool = QemuPool(kernel_image, qemu_pool, btp_address,
+                                      bt_server_address)
+        else:
+            self.qemu_pool = None
 
         if self.tty_file and board_name:  # DUT is a hardware board, not QEMU
             self.board = Board(board_name, kernel_image, tty_file)
@@ -70,18 +264,40 @@ class ZephyrCtl:
         self.qemu_process = None
         self.socat_process = None
         self.btp_socket = None
+        # QemuIUT taken from qemu_pool
+        self.pool_iut = None
 
     def start(self):
         """Starts the Zephyr OS"""
 
         log("%s.%s", self.__class__, self.start.__name__)
 
-        self.btp_socket = BTPWorker()
+        if self.warm and self.is_running():
+            try:
+                self.warm_reset()
+                self.iut_ready = True
+                return
+            except (BTPError, socket.timeout) as err:
+                log("Warm reset failed (%r), restarting IUT", err)
+                self.stop()
+
+        if self.qemu_pool:
+            # controllers are all used by the pool, so QEMU can not be
+            # started here if the pool fails to boot it
+            iut = self.qemu_pool.get()
+            log("Using pre-booted IUT %s", iut.btp_address)
+            self.pool_iut = iut
+            self.btp_socket = iut.btp_socket
+            self.qemu_process = iut.qemu_process
+            self.iut_ready = True
+            return
+
+        self.btp_socket = BTPMuxWorker(self.btp_address)
         self.btp_socket.open()
 
         if self.tty_file:
             socat_cmd = ("socat -x -v %s,rawer,b115200 UNIX-CONNECT:%s" %
-                         (self.tty_file, BTP_ADDRESS))
+                         (self.tty_file, self.btp_address))
 
             log("Starting socat process: %s", socat_cmd)
 
@@ -91,7 +307,8 @@ class ZephyrCtl:
                                                   stdout=IUT_LOG_FO,
                                                   stderr=IUT_LOG_FO)
         else:
-            qemu_cmd = get_qemu_cmd(self.kernel_image)
+            qemu_cmd = get_qemu_cmd(self.kernel_image, self.btp_address,
+                                    self.bt_server_address)
 
             log("Starting QEMU zephyr process: %s", qemu_cmd)
 
@@ -103,8 +320,59 @@ class ZephyrCtl:
 
         self.btp_socket.accept()
 
+    def is_running(self):
+        """Returns True if IUT is up and BTP connection is established"""
+        if not self.btp_socket or not self.btp_socket.conn:
+            return False
+
+        process = self.socat_process if self.tty_file else self.qemu_process
+
+        return process is not None and process.poll() is None
+
+    def warm_reset(self):
+        """Bring running IUT to the state of powered up IUT
+
+        Services other than GAP registered by previous test case are
+        unregistered. GAP is reset and stays registered, registering it again
+        is acknowledged by BTPMuxWorker.
+
+        """
+        log("%s.%s", self.__class__, self.warm_reset.__name__)
+
+        registered_svcs = self.btp_socket.registered_svcs | \
+            self.btp_socket.kept_svcs
+
+        self.btp_socket.reset_rx_queue()
+
+        for svc_id in registered_svcs - {defs.BTP_SERVICE_ID_GAP}:
+            self.btp_socket.send(defs.BTP_SERVICE_ID_CORE,
+                                 defs.CORE_UNREGISTER_SERVICE,
+                                 defs.BTP_INDEX_NONE, svc_id)
+
+            tuple_hdr, _ = self.btp_socket.read(timeout=WARM_RESET_TIMEOUT)
+            check_rsp_hdr(tuple_hdr, defs.BTP_SERVICE_ID_CORE,
+                          defs.CORE_UNREGISTER_SERVICE)
+
+        if defs.BTP_SERVICE_ID_GAP in registered_svcs:
+            self.btp_socket.send(defs.BTP_SERVICE_ID_GAP, defs.GAP_RESET,
+                                 0, "")
+
+            tuple_hdr, _ = self.btp_socket.read(timeout=WARM_RESET_TIMEOUT)
+            check_rsp_hdr(tuple_hdr, defs.BTP_SERVICE_ID_GAP, defs.GAP_RESET)
+
+        self.btp_socket.registered_svcs = set()
+        self.btp_socket.kept_svcs = \
+            registered_svcs & {defs.BTP_SERVICE_ID_GAP}
+
     def wait_iut_ready_event(self):
         """Wait until IUT sends ready event after power up"""
+        if self.iut_ready:
+            # pre-booted IUT already sent ready event, warm IUT does not
+            # send it at all
+            self.iut_ready = False
+            log("IUT already up, not waiting for ready event")
+            return
+
         if self.board:
             self.board.reset()
 
@@ -120,10 +388,33 @@ class ZephyrCtl:
         else:
             log("IUT ready event received OK")
 
+    def release(self, status):
+        """Called when test case is done. Powers off the Zephyr OS unless
+        it is kept warm for the next test case
+
+        status -- status of the test case, IUT is kept warm only if it passed
+        """
+        log("%s.%s %s", self.__class__, self.release.__name__, status)
+
+        if self.warm and status == "PASS" and self.is_running():
+            log("Keeping IUT running")
+            return
+
+        self.stop()
+
     def stop(self):
         """Powers off the Zephyr OS"""
         log("%s.%s", self.__class__, self.stop.__name__)
 
+        self.iut_ready = False
+
+        if self.pool_iut:
+            self.qemu_pool.release(self.pool_iut)
+            self.pool_iut = None
+            self.btp_socket = None
+            self.qemu_process = None
+            return
+
         if self.btp_socket:
             self.btp_socket.close()
             self.btp_socket = None
@@ -145,6 +436,14 @@ class ZephyrCtlStub:
         """Starts the Zephyr OS"""
         log("%s.%s", self.__class__, self.start.__name__)
 
+    def is_running(self):
+        """Returns True if IUT is up"""
+        return False
+
+    def release(self, status):
+        """Called when test case is done"""
+        log("%s.%s", self.__class__, self.release.__name__)
+
     def stop(self):
         """Powers off the Zephyr OS"""
         log("%s.%s", self.__class__, self.stop.__name__)
@@ -280,7 +579,8 @@ def init_stub():
     ZEPHYR = ZephyrCtlStub()
 
 
-def init(kernel_image, tty_file, board=None):
+def init(kernel_image, tty_file, board=None, warm=False, qemu_pool=0,
+         instance=None):
     """IUT init routine
 
     kernel_image -- Path to Zephyr kernel image
@@ -288,21 +588,34 @@ def init(kernel_image, tty_file, board=None):
                 BTP communication with HW DUT will be done over this TTY.
     board -- HW DUT board to use for testing. This parameter is used only
              if tty_file is specified
+    warm -- keep IUT running between test cases, see ZephyrCtl
+    qemu_pool -- number of QEMU instances to boot in advance, see ZephyrCtl
+    instance -- index of IUT when several IUTs are used by parallel workers,
+                it is added to BTP and btproxy socket and log file names
     """
     global IUT_LOG_FO
     global ZEPHYR
 
-    IUT_LOG_FO = open("iut-zephyr.log", "w")
+    if instance is None:
+        suffix = ""
+    else:
+        suffix = "-%d" % instance
+
+    IUT_LOG_FO = open("iut-zephyr%s.log" % suffix, "w")
 
-    ZEPHYR = ZephyrCtl(kernel_image, tty_file, board)
+    ZEPHYR = ZephyrCtl(kernel_image, tty_file, board, warm, qemu_pool,
+                       BTP_ADDRESS + suffix, BT_SERVER_ADDRESS + suffix)
 
 
 def cleanup():
     """IUT cleanup routine"""
     global IUT_LOG_FO, ZEPHYR
-    IUT_LOG_FO.close()
-    IUT_LOG_FO = None
 
     if ZEPHYR:
         ZEPHYR.stop()
+        if ZEPHYR.qemu_pool:
+            ZEPHYR.qemu_pool.close()
         ZEPHYR = None
+
+    IUT_LOG_FO.close()
+    IUT_LOG_FO = None
@@ -15,6 +15,8 @@
 
 """Test case that manages Zephyr IUT"""
 
+import time
+
 from ptsprojects.testcase import TestCaseLT1, TestCaseLT2, TestFunc, \
     TestFuncCleanUp
 from ptsprojects.stack import get_stack
@@ -38,8 +40,30 @@ class ZTestCase(TestCaseLT1):
         self.cmds.insert(1, TestFunc(self.zephyrctl.wait_iut_ready_event))
 
         self.cmds.append(TestFuncCleanUp(self.stack.cleanup))
-        # last command is to stop QEMU or HW
-        self.cmds.append(TestFuncCleanUp(self.zephyrctl.stop))
+
+    def wait_settled(self, timeout):
+        """Wait till PTS is done and IUT is disconnected or not running"""
+        deadline = time.time() + timeout
+
+        if not super(ZTestCase, self).wait_settled(timeout):
+            return False
+
+        gap = self.stack.gap
+        if not gap or not self.zephyrctl.is_running():
+            return True
+
+        return gap.wait_for_disconnection(deadline - time.time())
+
+    def post_run(self, error_code):
+        """Stops QEMU or HW after clean-up, unless it is kept warm
+
+        Commands are shared by copies of the test case, so release is called
+        here, where status of this run is known.
+        """
+        try:
+            super(ZTestCase, self).post_run(error_code)
+        finally:
+            self.zephyrctl.release(self.status)
 
 
 class ZTestCaseSlave(TestCaseLT2):
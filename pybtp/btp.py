@@ -25,7 +25,7 @@ from threading import Timer, Event
 import defs
 from types import BTPError, gap_settings_btp2txt, addr2btp_ba, Addr
 from pybtp.types import Perm
-from iutctl_common import set_event_handler
+from iutctl_common import set_event_handler, frame_logger
 from random import randint
 from collections import namedtuple
 from uuid import UUID
@@ -2700,10 +2700,9 @@ def l2cap_data_rcv_ev(l2cap, data, data_len):
     hdr_len = struct.calcsize(hdr_fmt)
 
     chan_id, data_len = struct.unpack_from(hdr_fmt, data)
-    data_rx = binascii.hexlify(struct.unpack_from('%ds' % data_len, data, hdr_len)[0])
-    l2cap.rx(chan_id, data_rx)
+    l2cap.rx(chan_id, data[hdr_len:hdr_len + data_len])
 
-    logging.debug("id:%r, data:%s", chan_id, data_rx)
+    logging.debug("id:%r, data len:%d", chan_id, data_len)
 
 
 L2CAP_EV = {
@@ -3232,7 +3231,8 @@ MESH_EV = {
 
 
 def event_handler(hdr, data):
-    logging.debug("%s %r %r", event_handler.__name__, hdr, data)
+    if frame_logger.isEnabledFor(logging.DEBUG):
+        frame_logger.debug("%s %r %r", event_handler.__name__, hdr, data)
 
     stack = get_stack()
     if not stack:
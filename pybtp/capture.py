@@ -0,0 +1,116 @@
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""BTP capture files
+
+Capture file starts with MAGIC followed by BTPTrace records: timestamp,
+direction, header and frame data, one per sent or received frame.
+
+"""
+
+import time
+import logging
+import threading
+
+from iutctl_common import BTPTrace, TRACE_RX
+from parser import Header
+
+log = logging.debug
+
+MAGIC = "BTPCAP01"
+CAPTURE_EXT = ".btpcap"
+
+
+class BTPCapture(object):
+    """Append-only BTP capture file writer"""
+
+    def __init__(self, path):
+        log("%s.%s %s", self.__class__.__name__, self.__init__.__name__, path)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+
+        if not self._file.tell():
+            self._file.write(MAGIC)
+
+    def write_record(self, record):
+        """Write packed BTPTrace record"""
+        with self._lock:
+            if self._file:
+                self._file.write(record)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+
+def read_capture(path):
+    """Generator of (timestamp, direction, svc_id, op, ctrl_index, data)
+    tuples of frames stored in capture file"""
+    hdr_size = BTPTrace.record_hdr.size
+
+    with open(path, "rb") as capture_file:
+        if capture_file.read(len(MAGIC)) != MAGIC:
+            raise Exception("%s is not a BTP capture file" % path)
+
+        while True:
+            record_hdr = capture_file.read(hdr_size)
+            if len(record_hdr) < hdr_size:
+                return
+
+            data_len = BTPTrace.record_hdr.unpack(record_hdr)[-1]
+            data = capture_file.read(data_len)
+            if len(data) < data_len:
+                logging.warning("%s truncated", path)
+                return
+
+            yield BTPTrace.unpack(record_hdr + data)
+
+
+def replay(path, event_handler, realtime=False):
+    """Feed events received by the client into event_handler
+
+    Frames are passed the same way BTPWorker passes them. Responses and sent
+    frames are skipped.
+
+    realtime -- keep the time between events as captured, otherwise replay
+                at full speed
+
+    Returns number of replayed events
+
+    """
+    count = 0
+    first_timestamp = None
+    start = time.time()
+
+    for timestamp, direction, svc_id, op, ctrl_index, data in \
+            read_capture(path):
+        if direction != TRACE_RX or op < 0x80:
+            continue
+
+        if realtime:
+            if first_timestamp is None:
+                first_timestamp = timestamp
+
+            delay = (timestamp - first_timestamp) - (time.time() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        event_handler(Header(svc_id, op, ctrl_index, len(data)), (data,))
+        count += 1
+
+    return count
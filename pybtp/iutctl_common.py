@@ -16,16 +16,29 @@
 import os
 import logging
 import socket
+import select
+import heapq
+import itertools
 import binascii
 import threading
+import time
+import bisect
+import struct
+import collections
 import Queue
 
 import defs
 from types import BTPError
-from parser import enc_frame, dec_hdr, dec_data, HDR_LEN
+from parser import enc_frame, dec_hdr, dec_data, HDR_LEN, Header
 
 log = logging.debug
 
+# Per-frame logging. Disabled by default, cause formatting every frame slows
+# down long throughput tests. Frames are recorded in BTP_TRACE instead. To get
+# them logged as they are sent and received set this logger level to DEBUG.
+frame_logger = logging.getLogger("btp.frames")
+frame_logger.setLevel(logging.INFO)
+
 # BTP communication transport: unix domain socket file name
 BTP_ADDRESS = "/tmp/bt-stack-tester"
 
@@ -39,20 +52,315 @@ def set_event_handler(event_handler):
     EVENT_HANDLER = event_handler
 
 
-class BTPSocket(object):
+class LatencyHistogram(object):
+    """Histogram of BTP response latencies
+
+    Bucket upper bounds are in seconds, last bucket collects everything else.
+
+    """
+
+    bounds = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all collected samples"""
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def add(self, latency):
+        """Record single latency sample in seconds"""
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+            self.count += 1
+            self.total += latency
+            self.max = max(self.max, latency)
+
+    def __str__(self):
+        """Returns string representation"""
+        with self._lock:
+            if not self.count:
+                return "no samples"
+
+            labels = ["<=%gms" % (b * 1000) for b in self.bounds] + \
+                [">%gms" % (self.bounds[-1] * 1000)]
+            buckets = " ".join("%s:%d" % (label, count) for label, count in
+                               zip(labels, self.counts) if count)
+
+            return "count=%d mean=%.3fms max=%.3fms %s" % (
+                self.count, self.total / self.count * 1000, self.max * 1000,
+                buckets)
+
+
+class DeadlineWaker(object):
+    """Calls wake-up functions at their deadlines from one shared thread
+
+    Condition.wait with timeout polls on Python 2, so waiters wait without
+    timeout and get woken up by this thread instead of a timer of their own.
+    The thread sleeps in select on a pipe, which is written to when a
+    deadline earlier than the ones it sleeps for is added.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # heap of [deadline, sequence number, function]
+        self._deadlines = []
+        self._seq = itertools.count()
+        self._pipe_r, self._pipe_w = None, None
+        self._wakeup_pending = False
+        self._thread = None
+
+    def add(self, deadline, func):
+        """Call func at deadline, returns handle to cancel it with"""
+        entry = [deadline, next(self._seq), func]
+
+        with self._lock:
+            if self._thread is None:
+                self._pipe_r, self._pipe_w = os.pipe()
+                self._thread = threading.Thread(target=self._run,
+                                                name="DeadlineWaker")
+                self._thread.daemon = True
+                self._thread.start()
+
+            heapq.heappush(self._deadlines, entry)
+
+            if self._deadlines[0] is entry and not self._wakeup_pending:
+                self._wakeup_pending = True
+                os.write(self._pipe_w, "x")
+
+        return entry
+
+    def cancel(self, entry):
+        """Do not call function added with add, if not called yet"""
+        with self._lock:
+            try:
+                self._deadlines.remove(entry)
+            except ValueError:
+                return
+
+            heapq.heapify(self._deadlines)
+
+    def _run(self):
+        # module globals are cleared on interpreter shutdown, while this
+        # daemon thread may still be woken up
+        get_time, heappop = time.time, heapq.heappop
+        select_fds, read = select.select, os.read
+
+        while True:
+            due = []
+
+            with self._lock:
+                now = get_time()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    due.append(heappop(self._deadlines)[2])
+
+                if self._deadlines:
+                    timeout = self._deadlines[0][0] - now
+                else:
+                    timeout = None
+
+            for func in due:
+                func()
+
+            readable, _, _ = select_fds([self._pipe_r], [], [], timeout)
+            if readable:
+                with self._lock:
+                    read(self._pipe_r, 1)
+                    self._wakeup_pending = False
+
+
+DEADLINE_WAKER = DeadlineWaker()
+
+
+class WaitQueue(object):
+    """FIFO queue whose get returns as soon as an item is put
+
+    Queue.get with timeout polls on Python 2, so getters wait without
+    timeout and DEADLINE_WAKER wakes them up at the deadline instead.
+
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._items = collections.deque()
+
+    def put(self, item):
+        with self._cond:
+            self._items.append(item)
+            self._cond.notify()
+
+    def _wake_all(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def get(self, timeout):
+        """Returns the oldest item
+
+        Raises Queue.Empty if no item was put in timeout seconds
+        """
+        with self._cond:
+            if self._items:
+                return self._items.popleft()
+
+        deadline = time.time() + timeout
+        wakeup = DEADLINE_WAKER.add(deadline, self._wake_all)
+
+        try:
+            with self._cond:
+                while not self._items:
+                    if time.time() >= deadline:
+                        raise Queue.Empty
+
+                    self._cond.wait()
+
+                return self._items.popleft()
+        finally:
+            DEADLINE_WAKER.cancel(wakeup)
+
+    def get_nowait(self):
+        with self._cond:
+            if not self._items:
+                raise Queue.Empty
+
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+
+def check_rsp_hdr(tuple_hdr, svc_id, op):
+    """Raise BTPError if tuple_hdr is not a valid response to svc_id, op"""
+    if tuple_hdr.svc_id != svc_id:
+        raise BTPError(
+            "Incorrect service ID %s in the response, expected %s!" %
+            (tuple_hdr.svc_id, svc_id))
+
+    if tuple_hdr.op == defs.BTP_STATUS:
+        raise BTPError("Error opcode in response!")
+
+    if op != tuple_hdr.op:
+        raise BTPError(
+            "Invalid opcode 0x%.2x in the response, expected 0x%.2x!" %
+            (tuple_hdr.op, op))
+
+
+TRACE_TX = 0
+TRACE_RX = 1
+
+
+class BTPTrace(object):
+    """Ring buffer of the most recent BTP frames
+
+    Each frame is stored as a packed record: timestamp, direction, header
+    and raw data. Records are formatted only when dumped.
+
+    """
+
+    record_hdr = struct.Struct("<dBBBBH")
+    direction_str = {TRACE_TX: "TX", TRACE_RX: "RX"}
+
+    def __init__(self, maxlen=4096):
+        self._records = collections.deque(maxlen=maxlen)
+
+    @classmethod
+    def pack(cls, direction, svc_id, op, ctrl_index, data):
+        """Returns packed record of frame, data is the frame payload"""
+        return cls.record_hdr.pack(time.time(), direction, svc_id, op,
+                                   ctrl_index, len(data)) + str(data)
+
+    @classmethod
+    def unpack(cls, record):
+        """Returns (timestamp, direction, svc_id, op, ctrl_index, data)"""
+        return cls.record_hdr.unpack_from(record)[:5] + \
+            (record[cls.record_hdr.size:],)
+
+    def add(self, record):
+        """Append packed record"""
+        self._records.append(record)
+
+    def clear(self):
+        """Drop all recorded frames"""
+        self._records.clear()
+
+    def records(self):
+        """Returns list of (timestamp, direction, svc_id, op, ctrl_index,
+        data) tuples, oldest first"""
+        return [self.unpack(record) for record in list(self._records)]
+
+    def dump(self, log_func=logging.info):
+        """Format recorded frames with log_func"""
+        records = self.records()
+
+        log_func("BTP trace, %d frames:", len(records))
+
+        for timestamp, direction, svc_id, op, ctrl_index, data in records:
+            log_func("%.6f %s svc 0x%.2x op 0x%.2x idx 0x%.2x len %d %s",
+                     timestamp, self.direction_str[direction], svc_id, op,
+                     ctrl_index, len(data), binascii.hexlify(data))
+
+
+BTP_TRACE = BTPTrace()
+
+# Optional sink of every frame record, see pybtp.capture
+BTP_CAPTURE = None
+
+
+def set_btp_capture(capture):
+    """Set object which write_record method gets every frame record"""
+    global BTP_CAPTURE
+
+    BTP_CAPTURE = capture
+
+
+def record_frame(direction, svc_id, op, ctrl_index, data):
+    """Record frame in BTP_TRACE and BTP_CAPTURE if set"""
+    record = BTPTrace.pack(direction, svc_id, op, ctrl_index, data)
+
+    BTP_TRACE.add(record)
+
+    if BTP_CAPTURE is not None:
+        BTP_CAPTURE.write_record(record)
+
+
+def trace_rx(tuple_hdr, tuple_data):
+    """Record received frame"""
+    record_frame(TRACE_RX, tuple_hdr.svc_id, tuple_hdr.op,
+                 tuple_hdr.ctrl_index, tuple_data[0])
+
+    if frame_logger.isEnabledFor(logging.DEBUG):
+        frame_logger.debug("Received: %r %s", tuple_hdr,
+                           binascii.hexlify(tuple_data[0]))
+
+
+class BTPSocket(object):
+
+    def __init__(self, address=None):
+        """Constructor
+
+        address - unix domain socket file name, BTP_ADDRESS if not specified
+        """
+        self.address = address or BTP_ADDRESS
         self.sock = None
         self.conn = None
         self.addr = None
 
+        # reused by every read, frames are read one at a time
+        self._hdr_buf = bytearray(HDR_LEN)
+
     def open(self):
         """Open BTP socket for IUT"""
-        if os.path.exists(BTP_ADDRESS):
-            os.remove(BTP_ADDRESS)
+        if os.path.exists(self.address):
+            os.remove(self.address)
 
         self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.sock.bind(BTP_ADDRESS)
+        self.sock.bind(self.address)
 
         # queue only one connection
         self.sock.listen(1)
@@ -71,7 +379,7 @@ class BTPSocket(object):
 
         timeout - read timeout in seconds"""
         toread_hdr_len = HDR_LEN
-        hdr = bytearray(toread_hdr_len)
+        hdr = self._hdr_buf
         hdr_memview = memoryview(hdr)
         self.conn.settimeout(timeout)
 
@@ -84,8 +392,6 @@ class BTPSocket(object):
         tuple_hdr = dec_hdr(hdr)
         toread_data_len = tuple_hdr.data_len
 
-        logging.debug("Received: hdr: %r %r", tuple_hdr, hdr)
-
         data = bytearray(toread_data_len)
         data_memview = memoryview(data)
 
@@ -96,29 +402,27 @@ class BTPSocket(object):
             toread_data_len -= nbytes
 
         tuple_data = dec_data(data)
-        log("Received data: %r, %r", tuple_data, data)
+        trace_rx(tuple_hdr, tuple_data)
         self.conn.settimeout(None)
 
         return tuple_hdr, tuple_data
 
     def send(self, svc_id, op, ctrl_index, data):
         """Send BTP formated data over socket"""
-        logging.debug("%s, %r %r %r %r",
-                      self.send.__name__, svc_id, op, ctrl_index, data)
-
         if isinstance(data, int):
             data = str(data)
             if len(data) == 1:
                 data = "0%s" % data
                 data = binascii.unhexlify(data)
 
-        hex_data = binascii.hexlify(data)
-        logging.debug("btpclient command: send %d %d %d %s",
-                      svc_id, op, ctrl_index, hex_data)
-
         bin = enc_frame(svc_id, op, ctrl_index, data)
 
-        logging.debug("sending frame %r", bin)
+        record_frame(TRACE_TX, svc_id, op, ctrl_index, data)
+        if frame_logger.isEnabledFor(logging.DEBUG):
+            frame_logger.debug("btpclient command: send %d %d %d %s",
+                               svc_id, op, ctrl_index,
+                               binascii.hexlify(data))
+
         self.conn.send(bin)
 
     def close(self):
@@ -131,22 +435,36 @@ class BTPSocket(object):
 
 
 class BTPWorker(BTPSocket):
-    def __init__(self):
-        super(BTPWorker, self).__init__()
+    def __init__(self, address=None):
+        super(BTPWorker, self).__init__(address)
 
-        self._rx_queue = Queue.Queue()
+        self._rx_queue = WaitQueue()
         self._running = threading.Event()
 
         self._rx_worker = threading.Thread(target=self._rx_task)
 
         self.event_handler_cb = None
 
+        # time spent by read() waiting for frames
+        self.rx_latency = LatencyHistogram()
+
+        # services registered since IUT was powered up
+        self.registered_svcs = set()
+        # services kept registered by warm IUT reset, registering them again
+        # is acknowledged without contacting IUT
+        self.kept_svcs = set()
+
     def _rx_task(self):
         while self._running.is_set():
             try:
                 data = super(BTPWorker, self).read(timeout=1.0)
 
                 hdr = data[0]
+                if (hdr.svc_id, hdr.op) == (defs.BTP_SERVICE_ID_CORE,
+                                            defs.CORE_EV_IUT_READY):
+                    self.registered_svcs.clear()
+                    self.kept_svcs.clear()
+
                 if hdr.op >= 0x80:
                     # Do not put handled events on RX queue
                     ret = EVENT_HANDLER(*data)
@@ -157,31 +475,36 @@ class BTPWorker(BTPSocket):
             except socket.timeout:
                 pass
 
-    @staticmethod
-    def _read_timeout(flag):
-        flag.clear()
-
     def read(self, timeout=20.0):
+        """Wait for frame received by RX worker
+
+        timeout - read timeout in seconds"""
         logging.debug("%s", self.read.__name__)
 
-        flag = threading.Event()
-        flag.set()
+        start = time.time()
 
-        t = threading.Timer(timeout, self._read_timeout, [flag])
-        t.start()
+        try:
+            data = self._rx_queue.get(timeout)
+        except Queue.Empty:
+            raise socket.timeout
 
-        while flag.is_set():
-            if self._rx_queue.empty():
-                continue
+        self.rx_latency.add(time.time() - start)
 
-            t.cancel()
+        return data
 
-            data = self._rx_queue.get()
-            self._rx_queue.task_done()
+    def send(self, svc_id, op, ctrl_index, data):
+        if svc_id == defs.BTP_SERVICE_ID_CORE and \
+                op == defs.CORE_REGISTER_SERVICE:
+            reg_svc_id = data if isinstance(data, int) else ord(data[0])
+
+            if reg_svc_id in self.kept_svcs:
+                log("Service %d kept registered, acknowledging", reg_svc_id)
+                self._rx_queue.put((Header(svc_id, op, ctrl_index, 0), ('',)))
+                return
 
-            return data
+            self.registered_svcs.add(reg_svc_id)
 
-        raise socket.timeout
+        super(BTPWorker, self).send(svc_id, op, ctrl_index, data)
 
     def send_wait_rsp(self, svc_id, op, ctrl_index, data, cb=None,
                       user_data=None):
@@ -191,32 +514,16 @@ class BTPWorker(BTPSocket):
         while ret:
             tuple_hdr, tuple_data = self.read()
 
-            if tuple_hdr.svc_id != svc_id:
-                raise BTPError(
-                    "Incorrect service ID %s in the response, expected %s!" %
-                    (tuple_hdr.svc_id, svc_id))
-
-            if tuple_hdr.op == defs.BTP_STATUS:
-                raise BTPError("Error opcode in response!")
-
-            if op != tuple_hdr.op:
-                raise BTPError(
-                    "Invalid opcode 0x%.2x in the response, expected 0x%.2x!" %
-                    (tuple_hdr.op, op))
+            check_rsp_hdr(tuple_hdr, svc_id, op)
 
             if cb and callable(cb):
                 ret = cb(tuple_data, user_data)
             else:
                 return tuple_data
 
-    def _reset_rx_queue(self):
-        while not self._rx_queue.empty():
-            try:
-                self._rx_queue.get_nowait()
-            except Queue.Empty:
-                continue
-
-            self._rx_queue.task_done()
+    def reset_rx_queue(self):
+        """Drop frames nobody has read"""
+        self._rx_queue.clear()
 
     def accept(self, timeout=10.0):
         logging.debug("%s", self.accept.__name__)
@@ -232,9 +539,263 @@ class BTPWorker(BTPSocket):
         if self._rx_worker.is_alive():
             self._rx_worker.join()
 
-        self._reset_rx_queue()
+        self.reset_rx_queue()
+
+        log("BTP read latency: %s", self.rx_latency)
 
         super(BTPWorker, self).close()
 
     def register_event_handler(self, event_handler):
         self.event_handler_cb = event_handler
+
+
+class BTPMux(object):
+    """Threads serving BTP sockets of several IUTs
+
+    Loop thread reads frames with select() from every registered
+    BTPMuxWorker connection. Events (op >= 0x80) are passed to the handler
+    thread, so a slow event handler does not hold up reading from the other
+    IUTs. Responses complete pending send_wait_rsp calls by (svc_id, op),
+    anything else is queued for BTPMuxWorker.read.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers = {}  # connection file descriptor -> worker
+        self._wakeup_r, self._wakeup_w = os.pipe()
+
+        # (worker, frame) handled by the handler thread in order received
+        self._handler_queue = Queue.Queue()
+
+        self._loop_thread = threading.Thread(target=self._loop,
+                                             name="BTPMux")
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+
+        self._handler_thread = threading.Thread(target=self._handle_events,
+                                                name="BTPMux events")
+        self._handler_thread.daemon = True
+        self._handler_thread.start()
+
+    def register(self, worker):
+        """Start serving worker connection"""
+        with self._lock:
+            self._workers[worker.conn.fileno()] = worker
+
+        self._wakeup()
+
+    def unregister(self, worker):
+        """Stop serving worker connection"""
+        with self._lock:
+            for fd, registered in self._workers.items():
+                if registered is worker:
+                    del self._workers[fd]
+
+        self._wakeup()
+
+    def queue_frame(self, worker, frame):
+        """Pass frame of worker to the handler thread"""
+        self._handler_queue.put((worker, frame))
+
+    def _wakeup(self):
+        """Make select() return to pick up changed worker set"""
+        os.write(self._wakeup_w, "x")
+
+    def _loop(self):
+        # module globals are cleared on interpreter shutdown, while this
+        # daemon thread may still be woken up
+        select_fds, select_error, read = select.select, select.error, os.read
+
+        while True:
+            with self._lock:
+                fds = self._workers.keys()
+
+            try:
+                readable, _, _ = select_fds(fds + [self._wakeup_r], [], [])
+            except select_error:
+                # connection closed while select()ed, refresh worker set
+                continue
+
+            for fd in readable:
+                if fd == self._wakeup_r:
+                    read(self._wakeup_r, 512)
+                    continue
+
+                with self._lock:
+                    worker = self._workers.get(fd)
+
+                if worker is None:
+                    continue
+
+                try:
+                    worker.rx_ready()
+                except Exception:
+                    logging.exception("BTPMux failed reading %r",
+                                      worker.address)
+                    self.unregister(worker)
+
+    def _handle_events(self):
+        while True:
+            worker, frame = self._handler_queue.get()
+
+            try:
+                worker.handle_frame(frame)
+            except Exception:
+                logging.exception("BTPMux failed handling %r of %r", frame,
+                                  worker.address)
+
+
+BTP_MUX = None
+BTP_MUX_LOCK = threading.Lock()
+
+
+def get_btp_mux():
+    """Returns BTPMux shared by all BTPMuxWorker instances"""
+    global BTP_MUX
+
+    with BTP_MUX_LOCK:
+        if BTP_MUX is None:
+            BTP_MUX = BTPMux()
+
+    return BTP_MUX
+
+
+class BTPMuxWorker(BTPWorker):
+    """BTPWorker served by the shared BTPMux threads
+
+    Does not start an RX thread of its own, so any number of IUTs is driven
+    by the two BTPMux threads.
+
+    """
+
+    def __init__(self, address=None):
+        super(BTPMuxWorker, self).__init__(address)
+
+        self._rx_buf = bytearray()
+
+        # (svc_id, op) -> WaitQueue of the pending send_wait_rsp
+        self._pending = {}
+        # frames passed to the handler thread and not handled yet, frames
+        # received after them are passed there too to keep their order
+        self._handler_frames = 0
+        self._pending_lock = threading.Lock()
+
+    def accept(self, timeout=10.0):
+        logging.debug("%s", self.accept.__name__)
+
+        BTPSocket.accept(self, timeout)
+
+        get_btp_mux().register(self)
+
+    def rx_ready(self):
+        """Called by BTPMux loop thread when connection has data to read"""
+        data = self.conn.recv(4096)
+        if not data:
+            raise socket.error("Connection closed by IUT")
+
+        self._rx_buf.extend(data)
+        rx_buf_len = len(self._rx_buf)
+        offset = 0
+
+        while rx_buf_len - offset >= HDR_LEN:
+            tuple_hdr = dec_hdr(buffer(self._rx_buf, offset, HDR_LEN))
+            data_len = tuple_hdr.data_len
+
+            if rx_buf_len - offset - HDR_LEN < data_len:
+                break
+
+            tuple_data = dec_data(
+                buffer(self._rx_buf, offset + HDR_LEN, data_len))
+            offset += HDR_LEN + data_len
+
+            trace_rx(tuple_hdr, tuple_data)
+            self._route((tuple_hdr, tuple_data))
+
+        # drop consumed frames at once, keep partial frame for next read
+        del self._rx_buf[:offset]
+
+    def _route(self, frame):
+        """Deliver received frame, events through the handler thread"""
+        hdr = frame[0]
+        if (hdr.svc_id, hdr.op) == (defs.BTP_SERVICE_ID_CORE,
+                                    defs.CORE_EV_IUT_READY):
+            self.registered_svcs.clear()
+            self.kept_svcs.clear()
+
+        with self._pending_lock:
+            if hdr.op >= 0x80 or self._handler_frames:
+                self._handler_frames += 1
+                get_btp_mux().queue_frame(self, frame)
+                return
+
+        self._deliver(frame)
+
+    def handle_frame(self, frame):
+        """Called by BTPMux handler thread for frame passed to it"""
+        try:
+            # Do not put handled events on RX queue
+            if frame[0].op < 0x80 or EVENT_HANDLER(*frame) is not True:
+                self._deliver(frame)
+        finally:
+            with self._pending_lock:
+                self._handler_frames -= 1
+
+    def _deliver(self, frame):
+        """Pass frame to send_wait_rsp waiting for it or to RX queue"""
+        tuple_hdr = frame[0]
+
+        with self._pending_lock:
+            rsp_queue = self._pending.get((tuple_hdr.svc_id, tuple_hdr.op))
+
+            # error status does not carry the opcode of failed command
+            if rsp_queue is None and tuple_hdr.op == defs.BTP_STATUS:
+                rsp_queue = next((queue for key, queue in
+                                  self._pending.items()
+                                  if key[0] == tuple_hdr.svc_id), None)
+
+        if rsp_queue is None:
+            rsp_queue = self._rx_queue
+
+        rsp_queue.put(frame)
+
+    def send_wait_rsp(self, svc_id, op, ctrl_index, data, cb=None,
+                      user_data=None, timeout=20.0):
+        rsp_queue = WaitQueue()
+
+        with self._pending_lock:
+            self._pending[(svc_id, op)] = rsp_queue
+
+        try:
+            BTPSocket.send(self, svc_id, op, ctrl_index, data)
+            ret = True
+
+            while ret:
+                start = time.time()
+
+                try:
+                    tuple_hdr, tuple_data = rsp_queue.get(timeout)
+                except Queue.Empty:
+                    raise socket.timeout
+
+                self.rx_latency.add(time.time() - start)
+
+                check_rsp_hdr(tuple_hdr, svc_id, op)
+
+                if cb and callable(cb):
+                    ret = cb(tuple_data, user_data)
+                else:
+                    return tuple_data
+        finally:
+            with self._pending_lock:
+                del self._pending[(svc_id, op)]
+
+    def close(self):
+        if self.conn:
+            get_btp_mux().unregister(self)
+
+        self.reset_rx_queue()
+
+        log("BTP read latency: %s", self.rx_latency)
+
+        BTPSocket.close(self)
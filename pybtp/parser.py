@@ -16,34 +16,50 @@
 import struct
 from collections import namedtuple
 
-HDR_LEN = 5
+# BTP header format
+# 0            8       16                 24            40
+# +------------+--------+------------------+-------------+
+# | Service ID | Opcode | Controller Index | Data Length |
+# +------------+--------+------------------+-------------+
+HDR_STRUCT = struct.Struct("<BBBH")
+HDR_LEN = HDR_STRUCT.size
+
+Header = namedtuple('Header', 'svc_id op ctrl_index data_len')
 
 
 def dec_hdr(bin):
     """Decode BTP frame header
 
-    BTP header format
-    0            8       16                 24            40
-    +------------+--------+------------------+-------------+
-    | Service ID | Opcode | Controller Index | Data Length |
-    +------------+--------+------------------+-------------+
+    bin -- any buffer holding at least HDR_LEN bytes
 
     """
-    Header = namedtuple('Header', 'svc_id op ctrl_index data_len')
-
-    return Header._make(struct.unpack("<BBBH", bin))
+    return Header._make(HDR_STRUCT.unpack_from(bin))
 
 
 def dec_data(bin):
-    data_len = len(bin)
+    """Decode BTP frame data
+
+    bin -- str, bytearray, buffer or memoryview holding frame data
+
+    """
+    if isinstance(bin, memoryview):
+        return (bin.tobytes(),)
 
-    return struct.unpack('<%ds' % data_len, bin)
+    return (str(bin),)
 
 
 def enc_frame(svc_id, op, ctrl_index, data):
-    str_data = str(bytearray(data))
-    int_len = len(str_data)
-    hex_len = struct.pack('h', int_len)
+    """Encode BTP frame
+
+    data -- str, bytearray or sequence of ints
+
+    Returns bytearray ready to be sent over socket
+
+    """
+    data_len = len(data)
+    frame = bytearray(HDR_LEN + data_len)
+
+    HDR_STRUCT.pack_into(frame, 0, svc_id, op, ctrl_index, data_len)
+    frame[HDR_LEN:] = data
 
-    return struct.pack('<BBB2s%ds' % int_len, svc_id, op, ctrl_index, hex_len,
-                       str_data)
+    return frame
@@ -26,9 +26,17 @@ def run_checks(py_files):
         "ptsprojects/ptstypes.py": "E501,E221,E203,E221",
         "ptscontrol.py": "E402",
         "ptsprojects/zephyr/iutctl.py": "E501",
+        "test/test-btp-mux.py": "E402",
+        "test/test-btp-parser.py": "E402",
+        "test/test-l2cap-rx-buffer.py": "E402",
         "test/test-mmi-parser.py": "E122,E501,E402",
+        "test/test-testcase-db.py": "E402",
+        "test/test-testcase-registry.py": "E402",
         "tools/btpclient.py": "E402",
-        "tools/create-workspace.py": "E402"
+        "tools/btp-codec-bench.py": "E402",
+        "tools/btpreplay.py": "E402",
+        "tools/create-workspace.py": "E402",
+        "tools/testcase-db-report.py": "E402"
     }
 
     total_files = len(py_files)
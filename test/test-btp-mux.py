@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Script to test BTPMuxWorker serving several IUT sockets
+
+Fake IUTs connect to the BTP sockets and write raw frames.
+
+"""
+
+import sys
+import os
+import socket
+import shutil
+import tempfile
+import threading
+
+# to be able to find pybtp module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pybtp import iutctl_common, defs
+from pybtp.iutctl_common import BTPMuxWorker
+from pybtp.parser import enc_frame
+
+GAP = defs.BTP_SERVICE_ID_GAP
+EV = 0x80
+
+# events handled so far, handler of GAP event 0x81 waits for release_event
+handled = []
+release_event = threading.Event()
+
+
+def event_handler(hdr, data):
+    handled.append((hdr.svc_id, hdr.op))
+
+    if hdr.op == 0x81:
+        release_event.wait()
+
+    # event 0x82 is left for readers
+    return hdr.op != 0x82
+
+
+def connect(worker):
+    """Returns socket of fake IUT connected to worker"""
+    iut = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    accept = threading.Thread(target=worker.accept)
+    accept.start()
+    iut.connect(worker.address)
+    accept.join()
+
+    return iut
+
+
+def frame(op, data=""):
+    return str(enc_frame(GAP, op, 0, data))
+
+
+iutctl_common.set_event_handler(event_handler)
+
+tmp_dir = tempfile.mkdtemp()
+workers = []
+
+try:
+    for name in ("a", "b"):
+        worker = BTPMuxWorker(os.path.join(tmp_dir, name))
+        worker.open()
+        workers.append(worker)
+
+    worker_a, worker_b = workers
+    iut_a, iut_b = [connect(worker) for worker in workers]
+
+    print "Frame split between reads"
+    wire = frame(0x01, "\x01\x02\x03")
+    iut_a.sendall(wire[:2])
+    iut_a.sendall(wire[2:])
+    hdr, data = worker_a.read(timeout=1)
+    assert (hdr.op, data) == (0x01, ("\x01\x02\x03",)), (hdr, data)
+    print "OK"
+
+    print "Response by (svc_id, op)"
+    threading.Timer(0.1, iut_b.sendall,
+                    [frame(0x05, "x") + frame(0x06, "y")]).start()
+    assert worker_b.send_wait_rsp(GAP, 0x06, 0, "") == ("y",)
+    hdr, data = worker_b.read(timeout=1)
+    assert (hdr.op, data) == (0x05, ("x",)), (hdr, data)
+
+    threading.Timer(0.1, iut_b.sendall,
+                    [str(enc_frame(GAP, defs.BTP_STATUS, 0, "\x01"))]).start()
+    try:
+        worker_b.send_wait_rsp(GAP, 0x07, 0, "")
+    except iutctl_common.BTPError:
+        pass
+    else:
+        assert False, "BTP_STATUS not matched to pending command"
+    print "OK"
+
+    print "Slow event handler"
+    iut_a.sendall(frame(0x81))
+    threading.Timer(0.1, iut_b.sendall, [frame(0x08)]).start()
+    assert worker_b.send_wait_rsp(GAP, 0x08, 0, "", timeout=1) == ("",)
+
+    # IUT A frames wait for its event to be handled
+    iut_a.sendall(frame(0x02))
+    try:
+        worker_a.read(timeout=0.2)
+    except socket.timeout:
+        pass
+    else:
+        assert False, "Frame passed event being handled"
+
+    release_event.set()
+    hdr, _ = worker_a.read(timeout=1)
+    assert hdr.op == 0x02, hdr
+    print "OK"
+
+    print "Event order"
+    iut_a.sendall(frame(EV) + frame(0x82) + frame(0x03))
+    assert [worker_a.read(timeout=1)[0].op for _ in range(2)] == [0x82, 0x03]
+    assert handled[-2:] == [(GAP, EV), (GAP, 0x82)], handled
+    print "OK"
+
+finally:
+    for worker in workers:
+        if worker.conn:
+            worker.close()
+
+    shutil.rmtree(tmp_dir)
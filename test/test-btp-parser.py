@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Script to test BTP frame codec, pybtp.parser
+
+Frames are encoded and decoded against known wire bytes, so the codec can be
+optimized without changing what is sent to and received from IUT.
+
+"""
+
+import sys
+import os
+
+# to be able to find pybtp module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pybtp.parser import enc_frame, dec_hdr, dec_data, HDR_LEN, Header
+
+# (svc_id, op, ctrl_index, data, frame on the wire)
+frames = [
+    # CORE read supported commands, no data
+    (0x00, 0x01, 0xff, "", "\x00\x01\xff\x00\x00"),
+
+    # GAP set connectable
+    (0x01, 0x06, 0x00, "\x01", "\x01\x06\x00\x01\x00\x01"),
+
+    # GAP connect: address type and address
+    (0x01, 0x0e, 0x00, "\x00\x01\x02\x03\x04\x05\x06",
+     "\x01\x0e\x00\x07\x00\x00\x01\x02\x03\x04\x05\x06"),
+
+    # L2CAP send data, data length takes both length bytes
+    (0x03, 0x05, 0x00, "\xab" * 0x1234,
+     "\x03\x05\x00\x34\x12" + "\xab" * 0x1234),
+]
+
+for svc_id, op, ctrl_index, data, wire in frames:
+    print "Frame: %r" % wire[:16]
+
+    for payload in (data, bytearray(data), [ord(c) for c in data]):
+        frame = enc_frame(svc_id, op, ctrl_index, payload)
+
+        assert isinstance(frame, bytearray), \
+            "Encoded %s to %s" % (type(payload), type(frame))
+        assert str(frame) == wire, \
+            "Error encoding %s payload %r, expected %r" % (
+                type(payload).__name__, str(frame)[:16], wire[:16])
+
+    for buf in (wire, bytearray(wire), buffer(wire)):
+        hdr = dec_hdr(buf)
+
+        assert hdr == Header(svc_id, op, ctrl_index, len(data)), \
+            "Error decoding header %r of %s" % (hdr, type(buf).__name__)
+
+    for buf in (buffer(wire, HDR_LEN), bytearray(wire[HDR_LEN:]),
+                memoryview(wire)[HDR_LEN:]):
+        assert dec_data(buf) == (data,), \
+            "Error decoding data of %s" % type(buf).__name__
+
+    print "OK"
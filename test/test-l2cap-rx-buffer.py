@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Script to test L2CAP received data buffer, ptsprojects.stack"""
+
+import sys
+import os
+import time
+import threading
+
+# to be able to find ptsprojects module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ptsprojects.stack import L2capRxBuffer, L2capChan
+
+print "Bounded buffer"
+rx_buf = L2capRxBuffer(max_len=8)
+
+rx_buf.append("\x01\x02\x03")
+rx_buf.append(bytearray("\x04\x05"))
+assert rx_buf.get() == "\x01\x02\x03\x04\x05"
+
+rx_buf.append("\x06\x07\x08\x09\x0a")
+assert len(rx_buf) == 8, "Buffer not trimmed to max_len"
+assert rx_buf.get() == "\x03\x04\x05\x06\x07\x08\x09\x0a"
+assert rx_buf.rx_count == 10
+print "OK"
+
+print "Verify data as it is received"
+rx_buf = L2capRxBuffer()
+assert rx_buf.is_verified() is None
+
+rx_buf.expect("abcdef")
+rx_buf.append("ab")
+assert rx_buf.is_verified() is None, "Verified before all data received"
+rx_buf.append("cdef")
+assert rx_buf.is_verified() is True
+assert rx_buf.get() == "abcdef"
+
+# data is matched exactly, not as a prefix
+rx_buf = L2capRxBuffer()
+rx_buf.expect("abcdef")
+rx_buf.append("abc")
+rx_buf.append("defgh")
+assert rx_buf.is_verified() is False, "More data than expected verified"
+
+rx_buf = L2capRxBuffer()
+rx_buf.append("abcdefgh")
+rx_buf.expect("abcdef")
+assert rx_buf.is_verified() is False, "Buffered data verified by prefix"
+
+rx_buf = L2capRxBuffer()
+rx_buf.expect("abcdef")
+rx_buf.append("abX")
+assert rx_buf.is_verified() is False, "Mismatch not detected"
+rx_buf.append("def")
+assert rx_buf.is_verified() is False, "Mismatch cleared by later data"
+print "OK"
+
+print "Verify buffered data"
+rx_buf = L2capRxBuffer()
+rx_buf.append("abc")
+rx_buf.expect("abcd")
+assert rx_buf.is_verified() is None
+rx_buf.append("d")
+assert rx_buf.is_verified() is True
+assert rx_buf.rx_count == 4
+print "OK"
+
+print "Discard verified data"
+rx_buf = L2capRxBuffer(max_len=4)
+rx_buf.expect("x" * 1000, discard=True)
+for _ in range(100):
+    rx_buf.append("x" * 10)
+assert rx_buf.is_verified() is True
+assert rx_buf.get() == "", "Verified data kept: %r" % rx_buf.get()
+
+# partially matched data is kept till all of it matched
+rx_buf = L2capRxBuffer()
+rx_buf.expect("abcdef", discard=True)
+rx_buf.append("abc")
+assert rx_buf.is_verified() is None
+assert rx_buf.get() == "abc", "Partial match discarded"
+rx_buf.expect(None)
+assert rx_buf.get() == "abc"
+
+# verified data is not verified again
+rx_buf = L2capRxBuffer()
+rx_buf.append("abc")
+rx_buf.expect("abc", discard=True)
+assert rx_buf.is_verified() is True
+rx_buf.expect("abc", discard=True)
+assert rx_buf.is_verified() is None
+
+# data that did not match is kept
+rx_buf = L2capRxBuffer()
+rx_buf.append("abc")
+rx_buf.expect("abd", discard=True)
+assert rx_buf.is_verified() is False
+assert rx_buf.get() == "abc"
+print "OK"
+
+print "Wait for data on channel"
+chan = L2capChan(0, 0x80, 0, "000000000000")
+chan.rx_expect("\x01\x02\x03\x04")
+
+threading.Timer(0.1, chan.rx, ["\x01\x02"]).start()
+threading.Timer(0.2, chan.rx, ["\x03\x04"]).start()
+
+start = time.time()
+assert chan.rx_verify(5), "Data not verified"
+assert time.time() - start < 1, "Not woken up on data"
+assert chan.rx_data_get(0) == "01020304"
+
+chan = L2capChan(1, 0x80, 0, "000000000000")
+chan.rx_expect("\xff")
+start = time.time()
+assert not chan.rx_verify(0.2), "Verified data not received"
+assert time.time() - start >= 0.2
+print "OK"
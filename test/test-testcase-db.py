@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Script to test TestCase.db statistics and history, TestCaseTable"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# to be able to find ptsprojects module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ptsprojects import testcase_db
+from ptsprojects.testcase_db import TestCaseTable, UPDATE_BATCH_SIZE
+
+
+def history_count(db):
+    return db.conn.execute(
+        "SELECT COUNT(*) FROM {}".format(db.history_name)).fetchone()[0]
+
+
+tmp_dir = tempfile.mkdtemp()
+testcase_db.DATABASE_FILE = os.path.join(tmp_dir, "TestCase.db")
+
+try:
+    print "Batched writes"
+    db = TestCaseTable("test", iut_build="abc123")
+
+    db.update_statistics("GAP/A", 10, "PASS")
+    assert history_count(db) == 0, "Update written before flush"
+
+    # last result of not yet written update is known
+    assert db.get_result("GAP/A") == "PASS"
+
+    for i in range(UPDATE_BATCH_SIZE - 1):
+        db.update_statistics("GAP/B", i, "PASS")
+
+    assert history_count(db) == UPDATE_BATCH_SIZE, \
+        "Full batch not written, %d rows" % history_count(db)
+    print "OK"
+
+    print "Running mean"
+    db.update_statistics("GAP/A", 20, "FAIL", retries=1)
+    db.flush()
+
+    assert db.get_mean_duration("GAP/A") == 15.0
+    assert db.get_result("GAP/A") == "FAIL"
+    assert db.get_mean_durations(["GAP/A", "GAP/X"]) == {"GAP/A": 15.0}
+    print "OK"
+
+    print "History"
+    row = db.conn.execute(
+        "SELECT run_id, iut_build, duration, result, retries FROM {} "
+        "WHERE name='GAP/A' ORDER BY timestamp, rowid".format(
+            db.history_name)).fetchall()[-1]
+    assert row == (db.run_id, "abc123", 20.0, "FAIL", 1), row
+
+    assert db.get_last_results("GAP/A") == ["FAIL", "PASS"]
+    assert db.get_last_results("GAP/A", 1) == ["FAIL"]
+    assert db.get_last_results("GAP/X") == []
+    print "OK"
+
+    print "History queries"
+    for duration, result, retries in [(1, "PASS", 0), (2, "PASS", 1),
+                                      (3, "FAIL", 0), (4, "PASS", 2)]:
+        db.update_statistics("SM/C", duration, result, retries)
+
+    assert db.get_duration_percentile("SM/C", 50) == 2
+    assert db.get_duration_percentile("SM/C", 95) == 4
+    assert db.get_duration_percentile("SM/C", 50, last_n=2) == 3
+    assert db.get_duration_percentile("SM/X", 50) is None
+
+    assert db.get_flake_rate("SM/C") == 0.5
+    assert db.get_flake_rate("SM/C", last_n=1) == 1.0
+    assert db.get_flake_rate("SM/X") is None
+
+    # GAP/B: sum(range(UPDATE_BATCH_SIZE - 1))
+    assert db.get_most_expensive(2) == [
+        ("GAP/B", float(sum(range(UPDATE_BATCH_SIZE - 1)))),
+        ("GAP/A", 30.0)]
+    print "OK"
+
+    print "Same timestamp"
+    real_time = testcase_db.time.time
+    testcase_db.time.time = lambda: 1000.0
+    try:
+        for result in ["FAIL", "INCONC", "PASS"]:
+            db.update_statistics("L2CAP/D", 1, result)
+    finally:
+        testcase_db.time.time = real_time
+
+    assert db.get_last_results("L2CAP/D") == ["PASS", "INCONC", "FAIL"]
+    assert db.get_last_results("L2CAP/D", 1) == ["PASS"]
+    print "OK"
+
+    print "Runs"
+    db.close()
+
+    db = TestCaseTable("test")
+    db.update_statistics("GAP/A", 30, "PASS")
+    db.close()
+
+    db = TestCaseTable("test", iut_build="def456")
+    db.update_statistics("GAP/A", 100, "PASS")
+    db.flush()
+
+    # durations of the build being tested are not used
+    assert db.get_baseline_durations(["GAP/A", "SM/C"]) == {
+        "GAP/A": 20.0, "SM/C": 2.5}
+    db.close()
+
+    db = TestCaseTable("test")
+    assert db.get_mean_duration("GAP/A") == 40.0
+    assert db.get_last_results("GAP/A") == ["PASS", "PASS", "FAIL", "PASS"]
+    assert len(set(row[0] for row in db.conn.execute(
+        "SELECT run_id FROM {} WHERE name='GAP/A'".format(
+            db.history_name)))) == 3, "Runs do not have own run_id"
+    db.close()
+    print "OK"
+
+finally:
+    shutil.rmtree(tmp_dir)
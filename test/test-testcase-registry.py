@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Script to test test case lookup, ptsprojects.testcase.TestCaseRegistry"""
+
+import sys
+import os
+
+# to be able to find ptsprojects module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ptsprojects.testcase import TestCaseRegistry, TestCaseLT1, TestCaseLT2
+
+# project name -> number of times its test cases were built
+built = {}
+
+
+def project(project_name, names):
+    """Returns function building test cases of project"""
+    def test_cases():
+        built[project_name] = built.get(project_name, 0) + 1
+
+        return [TestCaseLT1(project_name, name, []) for name in names]
+
+    return test_cases
+
+
+print "Lookup"
+lt1 = TestCaseLT1("GAP", "GAP/CONN/DCON/BV-01-C", [],
+                  lt2="GAP/CONN/DCON/BV-01-C-LT2")
+lt2 = TestCaseLT2("GAP", "GAP/CONN/DCON/BV-01-C-LT2", [])
+registry = TestCaseRegistry([lt1, lt2])
+
+assert registry.get("GAP/CONN/DCON/BV-01-C") is lt1
+assert registry.get("GAP/CONN/DCON/BV-01-C", TestCaseLT1) is lt1
+assert registry.get("GAP/CONN/DCON/BV-01-C", TestCaseLT2) is None
+assert registry.get("GAP/CONN/DCON/BV-01-C-LT2", TestCaseLT2) is lt2
+assert registry.get("GAP/CONN/DCON/BV-02-C") is None
+assert len(registry) == 2
+print "OK"
+
+print "Projects built on first lookup"
+registry = TestCaseRegistry()
+registry.add_project("GAP", project("GAP", ["GAP/BROB/BCST/BV-01-C",
+                                            "GAP/BROB/BCST/BV-02-C"]))
+registry.add_project("GATT", project("GATT", ["GATT/SR/GAC/BV-01-C"]))
+registry.add_project("L2CAP", project("L2CAP", ["L2CAP/LE/CFC/BV-01-C"]))
+
+assert not built, "Built before lookup: %r" % built
+
+assert registry.get("GATT/SR/GAC/BV-01-C").name == "GATT/SR/GAC/BV-01-C"
+assert built == {"GATT": 1}, "Not only GATT built: %r" % built
+
+# project is built once
+assert registry.get("GATT/SR/GAC/BV-02-C") is None
+assert "GATT/SR/GAC/BV-01-C" in registry
+assert built == {"GATT": 1}, "GATT built again: %r" % built
+
+assert "GAP/BROB/BCST/BV-02-C" in registry
+assert built == {"GATT": 1, "GAP": 1}
+
+# unknown project does not build the others
+assert registry.get("SM/MAS/PROT/BV-01-C") is None
+assert "L2CAP" not in built
+
+assert len(registry) == 4
+assert built == {"GATT": 1, "GAP": 1, "L2CAP": 1}
+print "OK"
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Micro-benchmark of the BTP frame codec in pybtp.parser"""
+
+import os
+import sys
+import timeit
+import argparse
+
+# to be able to find pybtp module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pybtp.parser import enc_frame, dec_hdr, dec_data, HDR_LEN
+
+# (name, payload length): small GAP command, L2CAP MTU, max mesh PDU
+PAYLOADS = [
+    ("empty", 0),
+    ("gap", 7),
+    ("l2cap", 256),
+    ("large", 1024),
+]
+
+
+def bench(name, payload_len, number):
+    data = "\xab" * payload_len
+    frame = enc_frame(0x03, 0x80, 0x00, data)
+
+    benchmarks = [
+        ("enc_frame", lambda: enc_frame(0x03, 0x80, 0x00, data)),
+        ("dec_hdr", lambda: dec_hdr(frame)),
+        ("dec_data", lambda: dec_data(buffer(frame, HDR_LEN))),
+    ]
+
+    for bench_name, func in benchmarks:
+        total = min(timeit.repeat(func, number=number, repeat=3))
+
+        print "%-8s %6d B  %-10s %8.3f us/frame" % (
+            name, payload_len, bench_name, total / number * 1e6)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("-n", "--number", type=int, default=100000,
+                            help="Number of frames per measurement")
+    args = arg_parser.parse_args()
+
+    for name, payload_len in PAYLOADS:
+        bench(name, payload_len, args.number)
+
+
+if __name__ == "__main__":
+    main()
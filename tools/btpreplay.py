@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Replay BTP capture files recorded with autoptsclient --btp-capture
+
+Received events are fed to pybtp.btp.event_handler, so client side stack
+handling can be debugged and measured without PTS or IUT.
+
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import binascii
+
+# to be able to find ptsprojects module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pybtp import btp
+from pybtp.capture import read_capture, replay
+from pybtp.iutctl_common import BTPTrace
+import ptsprojects.stack as stack
+
+
+def dump(path):
+    """Print frames stored in capture file"""
+    for timestamp, direction, svc_id, op, ctrl_index, data in \
+            read_capture(path):
+        print "%.6f %s svc 0x%.2x op 0x%.2x idx 0x%.2x len %d %s" % (
+            timestamp, BTPTrace.direction_str[direction], svc_id, op,
+            ctrl_index, len(data), binascii.hexlify(data))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("capture", nargs="+",
+                            help="BTP capture files to replay")
+    arg_parser.add_argument("--realtime", action="store_true", default=False,
+                            help="Keep time between events as captured "
+                            "instead of replaying at full speed")
+    arg_parser.add_argument("--dump", action="store_true", default=False,
+                            help="Only print frames stored in the files")
+    arg_parser.add_argument("--log", help="Log file of the stack handling")
+    args = arg_parser.parse_args()
+
+    if args.dump:
+        for path in args.capture:
+            dump(path)
+        return
+
+    if args.log:
+        logging.basicConfig(filename=args.log, filemode='w',
+                            level=logging.DEBUG)
+
+    stack.init_stack()
+    stack_inst = stack.get_stack()
+
+    for path in args.capture:
+        # fresh stack state for every test case
+        stack_inst.gap_init()
+        stack_inst.gatt_init()
+        stack_inst.l2cap_init(None)
+
+        start = time.time()
+        count = replay(path, btp.event_handler, args.realtime)
+        duration = time.time() - start
+
+        print "%s: %d events in %.3f s (%.0f events/s)" % (
+            path, count, duration, count / duration if duration else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+#
+# auto-pts - The Bluetooth PTS Automation Framework
+#
+# Copyright (c) 2019, Intel Corporation.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms and conditions of the GNU General Public License,
+# version 2, as published by the Free Software Foundation.
+#
+# This program is distributed in the hope it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+# more details.
+#
+
+"""Report test cases that took most of the time across runs stored in
+TestCase.db, along with their duration percentiles and flakiness"""
+
+import os
+import sys
+import argparse
+
+# to be able to find ptsprojects module
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ptsprojects import testcase_db
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("table",
+                            help="Table name, e.g. zephyr_qemu_x86")
+    arg_parser.add_argument("-d", "--database",
+                            default=testcase_db.DATABASE_FILE,
+                            help="Database file, default %(default)s")
+    arg_parser.add_argument("-n", "--number", type=int, default=10,
+                            help="Number of test cases to report")
+    arg_parser.add_argument("-l", "--last", type=int, default=None,
+                            help="Use only last runs of each test case")
+    args = arg_parser.parse_args()
+
+    if not os.path.exists(args.database):
+        sys.exit("%s does not exist" % args.database)
+
+    testcase_db.DATABASE_FILE = args.database
+    db = testcase_db.TestCaseTable(args.table)
+
+    print "%-40s %10s %8s %8s %6s  %s" % (
+        "Test case", "Total [s]", "p50 [s]", "p95 [s]", "Flaky", "Last")
+
+    for name, total in db.get_most_expensive(args.number):
+        print "%-40s %10.1f %8.1f %8.1f %5.0f%%  %s" % (
+            name, total,
+            db.get_duration_percentile(name, 50, args.last),
+            db.get_duration_percentile(name, 95, args.last),
+            db.get_flake_rate(name, args.last) * 100,
+            " ".join(db.get_last_results(name, 5)))
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@
 
 import logging
 import sys
+import binascii
 from pybtp import btp
 import re
 from ptsprojects.stack import get_stack
@@ -134,11 +135,17 @@ def hdl_wid_40(desc):
         return False
 
     stack = get_stack()
-    rx_data = stack.l2cap.rx_data_get_all(10)
+    # channels whose received data was not matched yet
+    channels = [chan.id for chan in stack.l2cap.channels]
 
     for value in data:
-        if value.upper() in rx_data:
-            rx_data.remove(value)
+        expected = binascii.unhexlify(value)
+
+        for chan_id in channels:
+            stack.l2cap.rx_expect(chan_id, expected, discard=True)
+            if stack.l2cap.rx_verify(chan_id, 10):
+                channels.remove(chan_id)
+                break
         else:
             return False
 